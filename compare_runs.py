@@ -0,0 +1,212 @@
+import os
+import json
+import html
+from collections import defaultdict
+
+from update_html import parse_clip_name
+
+COMPARE_JSON = 'compare.json'
+COMPARE_HTML = 'compare.html'
+
+def clip_key(record):
+    """同一个片段在不同运行之间共享的标识（不含文件名最后的后缀）"""
+    return (f"gdance_sample_{record['split']}_p{record['person_count']}_{record['video_id']}"
+            f"_{record['segment']}_{record['start_frame']}_{record['end_frame']}")
+
+def run_label(exp, record):
+    """运行的名称：优先使用元数据中的 model/checkpoint，否则使用文件名后缀"""
+    meta = exp.get('meta') or {}
+    model, checkpoint = meta.get('model'), meta.get('checkpoint')
+    if model and checkpoint:
+        return f"{model}@{checkpoint}"
+    return str(model or checkpoint or record['suffix'])
+
+def assign_run_labels(experiment_list):
+    """为可解析的实验确定运行名称，返回 [(片段标识, 运行名称, 实验)]
+
+    同一运行中只有部分文件有元数据时，没有元数据的文件沿用同一后缀下唯一的元数据名称；
+    同一片段中有多个文件得到相同名称时，该名称在所有片段中都改为 "名称/后缀"，避免互相覆盖。
+    """
+    parsed = []
+    meta_labels = defaultdict(set)
+    for exp in experiment_list:
+        record = parse_clip_name(exp['name'])
+        if record is None:
+            continue
+        label = run_label(exp, record)
+        if label != record['suffix']:
+            meta_labels[record['suffix']].add(label)
+        parsed.append((record, label, exp))
+
+    labelled = []
+    for record, label, exp in parsed:
+        inherited = meta_labels.get(label)
+        if label == record['suffix'] and inherited and len(inherited) == 1:
+            label = next(iter(inherited))
+        labelled.append((clip_key(record), label, record['suffix'], exp))
+
+    seen = set()
+    collided = set()
+    for key, label, _, _ in labelled:
+        if (key, label) in seen:
+            collided.add(label)
+        seen.add((key, label))
+    for label in sorted(collided):
+        print(f"  ⚠️  运行名称 {label} 在同一片段中对应多个文件，改用 {label}/<后缀> 区分")
+    return [(key, f"{label}/{suffix}" if label in collided else label, exp) for key, label, suffix, exp in labelled]
+
+def build_comparisons(experiment_list):
+    """按片段标识做哈希连接，返回出现在多个运行中的片段及其指标差值
+
+    参考运行是覆盖片段最多的运行（数量相同时按名称），每个片段的指标差值都相对于参考运行计算。
+    """
+    # 哈希连接：片段标识 -> {运行: 实验}
+    by_clip = defaultdict(dict)
+    for key, label, exp in assign_run_labels(experiment_list):
+        by_clip[key][label] = exp
+
+    shared = {key: runs for key, runs in by_clip.items() if len(runs) > 1}
+    if not shared:
+        return None
+
+    run_clip_counts = defaultdict(int)
+    for runs in shared.values():
+        for label in runs:
+            run_clip_counts[label] += 1
+    reference = min(run_clip_counts, key=lambda label: (-run_clip_counts[label], label))
+
+    clips = []
+    metric_sums = defaultdict(lambda: defaultdict(float))
+    metric_counts = defaultdict(lambda: defaultdict(int))
+    for key in sorted(shared):
+        runs = shared[key]
+        reference_metrics = {}
+        if reference in runs:
+            reference_metrics = (runs[reference].get('meta') or {}).get('metrics') or {}
+        entries = []
+        for label in sorted(runs, key=lambda l: (l != reference, l)):
+            exp = runs[label]
+            metrics = (exp.get('meta') or {}).get('metrics') or {}
+            deltas = {
+                name: value - reference_metrics[name]
+                for name, value in metrics.items()
+                if label != reference and isinstance(value, (int, float)) and isinstance(reference_metrics.get(name), (int, float))
+            }
+            for name, value in metrics.items():
+                if isinstance(value, (int, float)):
+                    metric_sums[label][name] += value
+                    metric_counts[label][name] += 1
+            entries.append({'run': label, 'name': exp['name'], 'file': exp['file'], 'metrics': metrics, 'deltas': deltas})
+        clips.append({'clip': key, 'entries': entries})
+
+    ranking = [
+        {
+            'run': label,
+            'clips': run_clip_counts[label],
+            'mean_metrics': {name: metric_sums[label][name] / metric_counts[label][name] for name in metric_sums[label]},
+        }
+        for label in sorted(run_clip_counts, key=lambda l: (-run_clip_counts[l], l))
+    ]
+    return {'reference': reference, 'ranking': ranking, 'clips': clips}
+
+def _fmt(value, signed=False):
+    if isinstance(value, float):
+        return f"{value:+.4g}" if signed else f"{value:.4g}"
+    return f"{value:+d}" if signed and isinstance(value, int) else str(value)
+
+def render_comparison_html(comparison):
+    """生成对比页面：运行排名表 + 每个片段的并排链接和指标差值"""
+    metric_names = sorted({name for run in comparison['ranking'] for name in run['mean_metrics']})
+    esc = html.escape
+
+    ranking_rows = "".join(
+        "<tr>" + f"<td>{esc(run['run'])}</td><td>{run['clips']}</td>"
+        + "".join(f"<td>{_fmt(run['mean_metrics'][name]) if name in run['mean_metrics'] else ''}</td>" for name in metric_names)
+        + "</tr>"
+        for run in comparison['ranking']
+    )
+    ranking_head = "<th>Run</th><th>Clips</th>" + "".join(f"<th>mean {esc(name)}</th>" for name in metric_names)
+
+    # 每个运行固定一列（按排名，参考运行在最前），片段在某个运行中不存在时留空
+    runs = [run['run'] for run in comparison['ranking']]
+    clip_head = "<th>Clip</th>" + "".join(f"<th>{esc(run)}</th>" for run in runs)
+    clip_sections = []
+    for clip in comparison['clips']:
+        by_run = {entry['run']: entry for entry in clip['entries']}
+        cells = []
+        for run in runs:
+            entry = by_run.get(run)
+            if entry is None:
+                cells.append('<td></td>')
+                continue
+            metrics = " · ".join(
+                f"{esc(name)} {_fmt(value)}"
+                + (f" <span class=\"delta\">({_fmt(entry['deltas'][name], signed=True)})</span>" if name in entry['deltas'] else "")
+                for name, value in entry['metrics'].items()
+            )
+            cells.append(
+                f'<td><a href="{esc(entry["file"])}" target="_blank">🎮 {esc(entry["name"])}</a>'
+                f'<div class="metrics">{metrics}</div></td>'
+            )
+        clip_sections.append(f'<tr><th>{esc(clip["clip"])}</th>{"".join(cells)}</tr>')
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>Group Dance 3D Plot - Checkpoint Comparison</title>
+    <meta charset="UTF-8">
+    <style>
+        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 20px; color: #2c3e50; }}
+        table {{ border-collapse: collapse; margin-bottom: 20px; }}
+        th, td {{ border: 1px solid #e0e0e0; padding: 6px 12px; text-align: left; vertical-align: top; }}
+        thead th {{ background: #ecf0f1; }}
+        #ranking thead th {{ cursor: pointer; }}
+        .metrics {{ color: #636e72; font-size: 0.85em; }}
+        .delta {{ color: #0984e3; }}
+    </style>
+</head>
+<body>
+    <h1>Checkpoint Comparison</h1>
+    <p><a href="index.html">← Back to index</a> &nbsp; Reference run: <strong>{esc(comparison['reference'])}</strong>,
+       {len(comparison['clips'])} clips shared by multiple runs. Deltas are relative to the reference run.</p>
+    <h2>Runs</h2>
+    <table id="ranking"><thead><tr>{ranking_head}</tr></thead><tbody>{ranking_rows}</tbody></table>
+    <h2>Clips</h2>
+    <table id="clips"><thead><tr>{clip_head}</tr></thead><tbody>{''.join(clip_sections)}</tbody></table>
+    <script>
+        // Click a column header in the ranking table to sort by it
+        document.querySelectorAll('#ranking thead th').forEach((th, col) => {{
+            th.addEventListener('click', () => {{
+                const body = th.closest('table').tBodies[0];
+                const asc = th.dataset.asc !== 'true';
+                th.dataset.asc = asc;
+                const key = row => {{ const v = row.cells[col].textContent; return isNaN(parseFloat(v)) ? v : parseFloat(v); }};
+                Array.from(body.rows)
+                    .sort((a, b) => (key(a) > key(b) ? 1 : key(a) < key(b) ? -1 : 0) * (asc ? 1 : -1))
+                    .forEach(row => body.appendChild(row));
+            }});
+        }});
+    </script>
+</body>
+</html>
+"""
+
+def write_comparison(experiment_list, output_dir="."):
+    """生成 compare.json / compare.html；没有可对比的片段时删除旧的对比页面"""
+    comparison = build_comparisons(experiment_list)
+    json_path = os.path.join(output_dir, COMPARE_JSON)
+    html_path = os.path.join(output_dir, COMPARE_HTML)
+
+    if comparison is None:
+        for path in (json_path, html_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return None
+
+    with open(json_path, "w", encoding='utf-8') as f:
+        json.dump(comparison, f, indent=2, ensure_ascii=False)
+    with open(html_path, "w", encoding='utf-8') as f:
+        f.write(render_comparison_html(comparison))
+    print(f"⚖️  对比视图: {len(comparison['clips'])} 个片段出现在 {len(comparison['ranking'])} 个运行中 "
+          f"(参考运行: {comparison['reference']})")
+    return comparison
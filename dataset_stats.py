@@ -0,0 +1,292 @@
+import gc
+import os
+import re
+import json
+import time
+import html
+import argparse
+
+import numpy as np
+
+from update_html import (CLIP_NAME_PATTERN, PERSON_COUNT_PATTERNS, collect_experiments, experiment_person_count,
+                         extract_person_count, parse_clip_name)
+
+STATS_JSON = 'stats.json'
+STATS_HTML = 'stats.html'
+
+# 无法确定人数的实验在数组中的取值
+UNKNOWN_PERSON = -1
+
+# 以下正则用于"每行一个文件名"的整段文本，字段不能跨行
+
+def _line_pattern(pattern):
+    """把匹配单个文件名的正则改写为匹配一行：字段不能包含换行符"""
+    return pattern.replace('[^_]', '[^_\\n]').replace('.+', '[^\\n]+?')
+
+# 由 update_html.CLIP_NAME_PATTERN 生成；每一行恰好产生一个匹配（不符合时各分组为空字符串），
+# 因此 findall 的结果与文件名一一对应。video_id 之后的字段都不含下划线，非贪婪匹配与原规则等价
+CLIP_LINE_PATTERN = re.compile(
+    r'^(?:' + _line_pattern(CLIP_NAME_PATTERN.pattern.lstrip('^').rstrip('$')) + r'|[^\n]*)$', re.MULTILINE
+)
+CLIP_LINE_COLUMNS = [CLIP_LINE_PATTERN.groupindex[key] - 1
+                     for key in ('split', 'person_count', 'video_id', 'start_frame', 'end_frame')]
+PERSON_LINE_PATTERNS = [re.compile(_line_pattern(p)) for p in PERSON_COUNT_PATTERNS]
+
+def _to_int(column, present):
+    """数字字符串列 -> int64 数组，present 为 False 的位置（空字符串）为 -1
+
+    filter/map 在 C 中逐个转换，比 NumPy 的字符串数组转换和 Python 循环都快。
+    """
+    values = np.full(len(present), -1, dtype=np.int64)
+    values[present] = np.fromiter(map(int, filter(None, column)), dtype=np.int64, count=int(present.sum()))
+    return values
+
+def _first_match_per_line(pattern, text, line_starts):
+    """在整段文本中查找，返回 (行号数组, 第一个分组)；每行只保留最左边的匹配，与 re.search 相同"""
+    matches = [(m.start(), m.group(1)) for m in pattern.finditer(text)]
+    if not matches:
+        return np.zeros(0, dtype=np.int64), []
+    positions, values = zip(*matches)
+    lines = np.searchsorted(line_starts, positions, side='right') - 1
+    lines, first = np.unique(lines, return_index=True)
+    return lines, [values[i] for i in first]
+
+def parse_names(names):
+    """批量解析文件名：文件名拼接为一段文本（每行一个），每个正则只对整段文本执行一次
+
+    返回 {'person', 'start', 'end', 'split', 'video'} 数组，与逐个调用 extract_person_count /
+    parse_clip_name 的结果相同。
+    """
+    text = '\n'.join(names)
+    if not names or text.count('\n') != len(names) - 1:
+        # 文件名中有换行符时无法按行对应，逐个解析
+        records = [parse_clip_name(name) for name in names]
+        counts = [extract_person_count(name) for name in names]
+        return {
+            'person': np.array([UNKNOWN_PERSON if c is None else c for c in counts], dtype=np.int16),
+            'start': np.array([r['start_frame'] if r else -1 for r in records], dtype=np.int64),
+            'end': np.array([r['end_frame'] if r else -1 for r in records], dtype=np.int64),
+            'split': np.array([r['split'] if r else '' for r in records], dtype=str),
+            'video': np.array([r['video_id'] if r else '' for r in records], dtype=str),
+        }
+
+    columns = list(zip(*CLIP_LINE_PATTERN.findall(text)))
+    split, person_count, video, start, end = (columns[i] for i in CLIP_LINE_COLUMNS)
+    split = np.array(split, dtype=str)
+    parsed = split != ''
+
+    # 标准命名的片段直接使用其中的人数（第一个人数模式在行首即可匹配）；
+    # 其余文件名按优先级依次匹配，每一轮只处理仍然未知的文件名
+    person = _to_int(person_count, parsed)
+    unknown = np.flatnonzero(~parsed)
+    for pattern in PERSON_LINE_PATTERNS:
+        if len(unknown) == 0:
+            break
+        subset = [names[i] for i in unknown.tolist()]
+        line_starts = np.cumsum([0] + [len(name) + 1 for name in subset[:-1]])
+        lines, values = _first_match_per_line(pattern, '\n'.join(subset), line_starts)
+        person[unknown[lines]] = np.fromiter(map(int, values), dtype=np.int64, count=len(values))
+        unknown = np.delete(unknown, lines)
+
+    return {
+        'person': person.astype(np.int16),
+        'start': _to_int(start, parsed),
+        'end': _to_int(end, parsed),
+        'split': split,
+        'video': np.array(video, dtype=str),
+    }
+
+def build_records(experiment_list):
+    """把实验列表转换为按列存储的 NumPy 数组（每个字段一列）
+
+    文件名由 parse_names 批量解析；大小使用扫描目录时记录的 exp['size']，没有时才 stat。
+    不读取页面内容，因此没有基于 plot 数据的统计。
+    """
+    # 解析会创建几十万个短字符串和元组，期间暂停分代 GC，避免反复扫描所有对象（否则约占一半耗时）
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        records = parse_names([exp['name'] for exp in experiment_list])
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    # 与索引页面的分组一致：元数据文件中的 num_dancers 优先
+    with_meta = [i for i, exp in enumerate(experiment_list) if exp.get('meta')]
+    for i in with_meta:
+        count = experiment_person_count(experiment_list[i])
+        records['person'][i] = UNKNOWN_PERSON if count is None else count
+
+    size = np.array([exp.get('size', -1) for exp in experiment_list], dtype=np.int64)
+    for i in np.flatnonzero(size < 0):
+        try:
+            size[i] = os.path.getsize(experiment_list[i]['file'])
+        except OSError:
+            size[i] = 0
+    records['size'] = size
+    return records
+
+def _coverage_per_video(video_ids, start, end):
+    """计算每个视频被片段覆盖的帧数（区间并集长度），向量化实现
+
+    按 (视频, 起始帧) 排序后，给每个视频加上单调递增的偏移量，
+    这样一次全局 maximum.accumulate 就等价于在每个视频内部求前缀最大值。
+    """
+    if len(video_ids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.lexsort((start, video_ids))
+    vid = video_ids[order]
+    s = start[order]
+    e = end[order]
+
+    offset = (int(e.max()) + 1) * vid.astype(np.int64)
+    s_off = s + offset
+    e_off = e + offset
+    running_end = np.maximum.accumulate(e_off)
+    # 每个区间之前已覆盖到的位置（每个视频的第一个区间没有前驱）
+    prev_end = np.empty_like(running_end)
+    prev_end[0] = s_off[0]
+    prev_end[1:] = running_end[:-1]
+    first = np.ones(len(vid), dtype=bool)
+    first[1:] = vid[1:] != vid[:-1]
+    prev_end[first] = s_off[first]
+
+    new_frames = np.clip(e_off - np.maximum(s_off, prev_end), 0, None)
+    return np.bincount(vid, weights=new_frames).astype(np.int64)
+
+def compute_stats(records):
+    """一次性计算数据集统计信息"""
+    person = records['person']
+    start, end, size = records['start'], records['end'], records['size']
+    parsed = start >= 0
+    length = np.where(parsed, end - start, 0)
+
+    # 按人数分组
+    groups, group_idx = np.unique(person, return_inverse=True)
+    clip_counts = np.bincount(group_idx, minlength=len(groups))
+    parsed_counts = np.bincount(group_idx, weights=parsed, minlength=len(groups))
+    frame_totals = np.bincount(group_idx, weights=length, minlength=len(groups))
+    byte_totals = np.bincount(group_idx, weights=size, minlength=len(groups))
+
+    # 人数升序，unknown 放在最后（与索引页面的分组顺序一致）
+    by_group = {}
+    group_order = np.argsort(np.where(groups == UNKNOWN_PERSON, np.iinfo(np.int16).max, groups), kind='stable')
+    groups, clip_counts, parsed_counts, frame_totals, byte_totals = (
+        a[group_order] for a in (groups, clip_counts, parsed_counts, frame_totals, byte_totals)
+    )
+    for g, clips, n_parsed, frames, nbytes in zip(groups, clip_counts, parsed_counts, frame_totals, byte_totals):
+        key = 'unknown' if g == UNKNOWN_PERSON else str(int(g))
+        by_group[key] = {
+            'clips': int(clips),
+            'total_frames': int(frames),
+            'mean_frames': round(float(frames / n_parsed), 1) if n_parsed else None,
+            'storage_bytes': int(nbytes),
+        }
+
+    # 按数据划分 (train/val/test ...)
+    split_names, split_idx = np.unique(records['split'][parsed].astype(str), return_inverse=True)
+    split_counts = np.bincount(split_idx, minlength=len(split_names))
+    n_parsed = int(parsed.sum())
+    by_split = {
+        str(name): {'clips': int(count), 'fraction': round(float(count / n_parsed), 4)}
+        for name, count in zip(split_names, split_counts)
+    }
+
+    # 按视频的覆盖帧数
+    video_names, video_idx = np.unique(records['video'][parsed].astype(str), return_inverse=True)
+    coverage = _coverage_per_video(video_idx, start[parsed], end[parsed])
+    video_clips = np.bincount(video_idx, minlength=len(video_names))
+    by_video = {
+        str(name): {'clips': int(clips), 'covered_frames': int(covered)}
+        for name, clips, covered in zip(video_names, video_clips, coverage)
+    }
+
+    return {
+        'total_clips': int(len(person)),
+        'parsed_clips': n_parsed,
+        'total_frames': int(length.sum()),
+        'mean_frames': round(float(length[parsed].mean()), 1) if n_parsed else None,
+        'storage_bytes': int(size.sum()),
+        'videos': len(video_names),
+        'by_group_size': by_group,
+        'by_split': by_split,
+        'by_video': by_video,
+    }
+
+def _table(title, headers, rows):
+    head = "".join(f"<th>{html.escape(h)}</th>" for h in headers)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(cell))}</td>" for cell in row) + "</tr>"
+        for row in rows
+    )
+    return f"<h2>{html.escape(title)}</h2>\n<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>\n"
+
+def render_stats_html(stats):
+    """生成简单的统计摘要页面"""
+    mb = lambda n: f"{n / 1024 / 1024:.2f}"
+    sections = [
+        _table("Overview", ["Clips", "Parsed", "Videos", "Total frames", "Mean frames", "Storage (MB)"], [[
+            stats['total_clips'], stats['parsed_clips'], stats['videos'],
+            stats['total_frames'], stats['mean_frames'], mb(stats['storage_bytes']),
+        ]]),
+        _table("By group size", ["Group size", "Clips", "Total frames", "Mean frames", "Storage (MB)"], [
+            [key, g['clips'], g['total_frames'], g['mean_frames'], mb(g['storage_bytes'])]
+            for key, g in stats['by_group_size'].items()
+        ]),
+        _table("By split", ["Split", "Clips", "Fraction"], [
+            [key, s['clips'], f"{s['fraction']:.1%}"] for key, s in stats['by_split'].items()
+        ]),
+        _table("By video", ["Video ID", "Clips", "Covered frames"], [
+            [key, v['clips'], v['covered_frames']]
+            for key, v in sorted(stats['by_video'].items(), key=lambda kv: -kv[1]['clips'])
+        ]),
+    ]
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>Group Dance 3D Plot - Dataset Statistics</title>
+    <meta charset="UTF-8">
+    <style>
+        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 20px; color: #2c3e50; }}
+        table {{ border-collapse: collapse; margin-bottom: 20px; }}
+        th, td {{ border: 1px solid #e0e0e0; padding: 6px 12px; text-align: right; }}
+        th {{ background: #ecf0f1; }}
+        td:first-child {{ text-align: left; }}
+    </style>
+</head>
+<body>
+    <h1>Dataset Statistics</h1>
+    <p><a href="index.html">← Back to index</a></p>
+{''.join(sections)}</body>
+</html>
+"""
+
+def write_dataset_stats(experiment_list, output_dir="."):
+    """计算统计信息并写出 stats.json / stats.html"""
+    t0 = time.perf_counter()
+    stats = compute_stats(build_records(experiment_list))
+    elapsed = time.perf_counter() - t0
+
+    with open(os.path.join(output_dir, STATS_JSON), "w", encoding='utf-8') as f:
+        json.dump(stats, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(output_dir, STATS_HTML), "w", encoding='utf-8') as f:
+        f.write(render_stats_html(stats))
+
+    print(f"📊 数据集统计: {stats['total_clips']} 个片段, {stats['videos']} 个视频, "
+          f"{stats['total_frames']} 帧, {stats['storage_bytes'] / 1024 / 1024:.2f} MB ({elapsed:.3f} 秒)")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="统计 results/ 中片段的人数、长度、视频覆盖和存储占用")
+    parser.add_argument('--root', default='results', help="结果目录")
+    parser.add_argument('--output-dir', default='.', help="stats.json / stats.html 的输出目录")
+    args = parser.parse_args()
+
+    # 与索引使用同一份实验列表（跳过重复、包含打包的实验和元数据，扫描时记录大小）
+    experiments = collect_experiments(args.root)
+    if experiments is None:
+        return
+    write_dataset_stats(experiments, args.output_dir)
+
+if __name__ == "__main__":
+    main()
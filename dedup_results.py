@@ -0,0 +1,192 @@
+import os
+import json
+import hashlib
+import argparse
+from collections import defaultdict
+
+from optimize_plots import COORD_KEYS, atomic_write_text, file_sha256, find_plotly_calls, is_result_page
+from pack_results import PACK_DIR, load_pack_index
+
+# 重复文件记录，索引构建时据此跳过重复条目:
+#   {重复实验名: {"keep": 保留实验名, "keep_file": 保留文件名, "file": 重复文件名, "sha256": 内容哈希,
+#                 "size"/"mtime_ns": 重复文件的状态, "keep_size"/"keep_mtime_ns": 保留文件的状态}}
+# 记录是否有效按内容判断：文件状态与记录相同时直接使用记录的哈希，否则重新计算；
+# 两个文件被原地重写（例如 transform_results）但内容仍然相同时记录继续有效
+DUPLICATES_FILE = 'duplicates.json'
+
+def _read_duplicates(root):
+    path = os.path.join(root, DUPLICATES_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  无法读取重复文件记录 {path}: {e}")
+        return {}
+
+def _content_hash(path, size, mtime_ns, recorded):
+    """文件的内容哈希；文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if st.st_size == size and st.st_mtime_ns == mtime_ns:
+        return recorded
+    return file_sha256(path)
+
+def _entry_valid(root, entry, pack_entries):
+    """保留文件仍然存在（或已打包），且重复文件已被删除或内容与保留文件相同"""
+    if not isinstance(entry, dict) or 'sha256' not in entry:
+        return False  # 旧格式的记录
+    keep_hash = _content_hash(os.path.join(root, entry['keep_file']),
+                              entry['keep_size'], entry['keep_mtime_ns'], entry['sha256'])
+    if keep_hash is None:
+        # pack_results --remove-sources 删除了保留文件，内容在分片中
+        packed = pack_entries.get(entry['keep'])
+        if packed is None:
+            return False
+        keep_hash = packed['sha256']
+    duplicate_hash = _content_hash(os.path.join(root, entry['file']), entry['size'], entry['mtime_ns'], entry['sha256'])
+    return duplicate_hash is None or duplicate_hash == keep_hash
+
+def load_duplicates(root='results', pack_dir=PACK_DIR):
+    """读取 results/duplicates.json，返回仍然有效的 {重复实验名: 保留实验名}"""
+    pack_entries = load_pack_index(pack_dir)['entries']
+    return {name: entry['keep'] for name, entry in _read_duplicates(root).items()
+            if _entry_valid(root, entry, pack_entries)}
+
+def _canonical_order(root, files):
+    """同一组重复文件中，最早生成的文件作为保留文件（时间相同时按文件名）"""
+    return sorted(files, key=lambda f: (os.path.getmtime(os.path.join(root, f)), f))
+
+def find_exact_duplicates(root='results'):
+    """按内容哈希查找完全相同的文件；先按文件大小预筛选，只对大小相同的文件计算哈希"""
+    by_size = defaultdict(list)
+    for file in os.listdir(root):
+        if is_result_page(file):
+            by_size[os.path.getsize(os.path.join(root, file))].append(file)
+
+    groups = []
+    for files in by_size.values():
+        if len(files) < 2:
+            continue
+        by_hash = defaultdict(list)
+        for file in files:
+            by_hash[file_sha256(os.path.join(root, file))].append(file)
+        groups.extend(_canonical_order(root, same) for same in by_hash.values() if len(same) > 1)
+    return groups
+
+def trace_signature(content, decimals=2):
+    """根据 trace 坐标数据计算签名：坐标按精度取整后哈希，忽略页面中的id、布局等差异"""
+    h = hashlib.sha256()
+    found = False
+
+    def feed(obj):
+        nonlocal found
+        if isinstance(obj, list):
+            for v in obj:
+                feed(v)
+        elif isinstance(obj, dict):
+            for key in sorted(obj):
+                value = obj[key]
+                if key in COORD_KEYS and isinstance(value, list):
+                    found = True
+                    rounded = [round(v, decimals) if isinstance(v, float) else v for v in value]
+                    h.update(key.encode('ascii'))
+                    h.update(json.dumps(rounded, separators=(',', ':')).encode('utf-8'))
+                else:
+                    feed(value)
+
+    for kind, args in find_plotly_calls(content):
+        # newPlot 的第一个参数是 traces，addFrames 的第一个参数是动画帧
+        h.update(kind.encode('ascii'))
+        feed(args[0][2])
+    return h.hexdigest() if found else None
+
+def find_near_duplicates(root='results', decimals=2, exclude=()):
+    """按 trace 数据签名查找内容近似相同的文件（只报告，不做处理）"""
+    by_signature = defaultdict(list)
+    for file in os.listdir(root):
+        if not is_result_page(file) or file in exclude:
+            continue
+        with open(os.path.join(root, file), 'r', encoding='utf-8') as f:
+            signature = trace_signature(f.read(), decimals)
+        if signature is not None:
+            by_signature[signature].append(file)
+    return [_canonical_order(root, files) for files in by_signature.values() if len(files) > 1]
+
+def apply_exact_duplicates(groups, root='results', mode='report'):
+    """处理完全重复的文件
+
+    mode:
+        report   - 只记录到 duplicates.json（索引中每个内容只列出一次）
+        hardlink - 用指向保留文件的硬链接替换重复文件
+        collapse - 删除重复文件
+    """
+    # 每次按当前的哈希分组重新生成记录；只保留以前已被删除（collapse）且仍然有效的记录
+    pack_entries = load_pack_index()['entries']
+    duplicates = {name: entry for name, entry in _read_duplicates(root).items()
+                  if _entry_valid(root, entry, pack_entries) and not os.path.exists(os.path.join(root, entry['file']))}
+    saved_bytes = 0
+
+    for group in groups:
+        keep, *others = group
+        keep_path = os.path.join(root, keep)
+        for file in others:
+            path = os.path.join(root, file)
+            if mode == 'hardlink' and not os.path.samefile(path, keep_path):
+                tmp_path = path + '.tmp-link'
+                os.link(keep_path, tmp_path)
+                os.replace(tmp_path, path)
+                saved_bytes += os.path.getsize(keep_path)
+                print(f"  🔗 {file} -> {keep}")
+            st = os.stat(path)
+            keep_st = os.stat(keep_path)
+            duplicates[file.split('.')[0]] = {
+                'keep': keep.split('.')[0], 'keep_file': keep, 'file': file, 'sha256': file_sha256(keep_path),
+                'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                'keep_size': keep_st.st_size, 'keep_mtime_ns': keep_st.st_mtime_ns,
+            }
+            if mode == 'collapse':
+                saved_bytes += st.st_size
+                os.remove(path)
+                print(f"  🗑️  {file} (与 {keep} 相同)")
+            elif mode == 'report':
+                print(f"  📋 {file} == {keep}")
+
+    atomic_write_text(os.path.join(root, DUPLICATES_FILE),
+                      json.dumps(duplicates, indent=2, ensure_ascii=False, sort_keys=True))
+    return saved_bytes
+
+def main():
+    parser = argparse.ArgumentParser(description="查找 results/ 中重复或近似重复的可视化页面")
+    parser.add_argument('--root', default='results', help="结果目录")
+    parser.add_argument('--mode', choices=('report', 'hardlink', 'collapse'), default='report',
+                        help="完全重复文件的处理方式")
+    parser.add_argument('--near', action='store_true', help="同时按 trace 数据签名查找近似重复的文件")
+    parser.add_argument('--decimals', type=int, default=2, help="计算 trace 签名时坐标保留的小数位数")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.root):
+        print(f"❌ 目录 '{args.root}' 不存在")
+        return
+
+    print(f"🔍 按内容哈希查找重复文件: {args.root}")
+    groups = find_exact_duplicates(args.root)
+    n_duplicates = sum(len(group) - 1 for group in groups)
+    print(f"📊 找到 {len(groups)} 组完全重复的文件，共 {n_duplicates} 个重复")
+    saved_bytes = apply_exact_duplicates(groups, args.root, args.mode)
+    if saved_bytes:
+        print(f"💾 节省空间: {saved_bytes / 1024 / 1024:.2f} MB")
+
+    if args.near:
+        print(f"\n🔍 按 trace 数据签名查找近似重复文件 (精度: {args.decimals} 位小数)...")
+        exact = {file for group in groups for file in group[1:]}
+        near_groups = find_near_duplicates(args.root, args.decimals, exclude=exact)
+        for group in near_groups:
+            print(f"  ≈ {group[0]}: {', '.join(group[1:])}")
+        print(f"📊 找到 {len(near_groups)} 组近似重复的文件")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import os
+import sys
+import hashlib
+import argparse
+from array import array
+from datetime import datetime, timedelta
+
+try:
+    import resource  # 只在类 Unix 系统上可用，用于报告峰值内存
+except ImportError:
+    resource = None
+
+from dedup_results import load_duplicates
+from optimize_plots import OPTIMIZED_DIR, atomic_writer, is_result_page
+from pack_results import PACK_DIR, load_pack_index
+from update_html import (GROUP_CLOSE, INDEX_VERSION_LENGTH, PAGE_TAIL_TEMPLATE, IndexTimeParser, extract_person_count,
+                         parse_time_string, render_exp_item, render_group_open, render_page_head)
+
+# 低内存构建：每个实验只占用几个定长数组中的一格，字符串在写出页面时才生成
+DEFAULT_BUDGET_MB = 256
+UNKNOWN_GROUP = -1
+NO_TIME = -2 ** 63
+FLAG_OPTIMIZED = 1  # results_optimized/ 中有不旧于原始文件的优化版本
+FLAG_PACKED = 2     # 原始文件已删除，由分片提供
+MIN_UPDATE_THRESHOLD_US = 1_000_000  # 与 create_visualization_index 相同的 1 秒更新阈值
+
+def _to_us(dt):
+    """naive 本地时间 -> 微秒时间戳（整数运算，避免浮点误差）"""
+    return int(dt.replace(microsecond=0).timestamp()) * 1_000_000 + dt.microsecond
+
+class CompactRecords:
+    """数组存储的实验记录
+
+    文件名以 UTF-8 拼接在一个 bytearray 中（按偏移访问，不为每个实验保留 str 对象），
+    时间是 int64 微秒时间戳，人数是 int16（-1 表示未知）。
+    """
+
+    def __init__(self):
+        self._names = bytearray()
+        self._offsets = array('q', [0])
+        self.mtime_us = array('q')
+        self.time_us = array('q')   # 索引中记录的时间，确定显示时间后原地覆盖
+        self.group = array('h')
+        self.flags = array('b')
+        # 打包的实验都在扫描 results/ 之后追加，分片信息只为序号 >= packed_start 的实验保存
+        self.packed_start = None
+        self.pack_shard = array('h')  # 分片在 self.shards 中的序号
+        self.pack_offset = array('q')
+        self.pack_length = array('q')
+        self.shards = []
+
+    def __len__(self):
+        return len(self.mtime_us)
+
+    def append(self, filename, mtime_us, flags=0, pack=None):
+        self._names += filename.encode('utf-8')
+        self._offsets.append(len(self._names))
+        person_count = extract_person_count(filename.split('.')[0])
+        self.group.append(UNKNOWN_GROUP if person_count is None else person_count)
+        self.mtime_us.append(mtime_us)
+        self.time_us.append(NO_TIME)
+        self.flags.append(flags)
+        if pack is not None:
+            if self.packed_start is None:
+                self.packed_start = len(self) - 1
+            shard, offset, length = pack
+            self.pack_shard.append(shard)
+            self.pack_offset.append(offset)
+            self.pack_length.append(length)
+
+    def filename(self, i):
+        return self._names[self._offsets[i]:self._offsets[i + 1]].decode('utf-8')
+
+    def name(self, i):
+        return self.filename(i).split('.')[0]
+
+class NameLookup:
+    """开放寻址的哈希表（两个 int64 数组），代替 {name: index} 字典"""
+
+    def __init__(self, records):
+        self.records = records
+        size = 1 << max(4, (2 * len(records)).bit_length())  # 装载因子不超过 0.5
+        self.mask = size - 1
+        self.hashes = array('q', bytes(8 * size))
+        self.slots = array('q', bytes(8 * size))  # 实验序号 + 1，0 表示空位
+        for i in range(len(records)):
+            h = hash(records.name(i))
+            pos = h & self.mask
+            while self.slots[pos]:
+                pos = (pos + 1) & self.mask
+            self.hashes[pos] = h
+            self.slots[pos] = i + 1
+
+    def find(self, name):
+        """返回所有同名实验的序号（不同扩展名的文件可能得到相同的实验名）"""
+        h = hash(name)
+        pos = h & self.mask
+        matches = []
+        while self.slots[pos]:
+            if self.hashes[pos] == h and self.records.name(self.slots[pos] - 1) == name:
+                matches.append(self.slots[pos] - 1)
+            pos = (pos + 1) & self.mask
+        return matches
+
+class IndexTimeJoin(IndexTimeParser):
+    """边解析现有索引边把时间写入记录数组，不保留 (name, time) 列表"""
+
+    def __init__(self, records, lookup):
+        super().__init__()
+        self.records = records
+        self.lookup = lookup
+        self.joined_count = 0
+        self.failed_count = 0
+
+    def _emit(self, time_str, kind):
+        name, self._pending_name = self._pending_name, None
+        if name is None:
+            return
+        indices = [i for i in self.lookup.find(name) if self.records.time_us[i] == NO_TIME]
+        if not indices:
+            return
+        # 与 parse_existing_index 相同：每个实验名使用第一个能解析的时间
+        datetime_obj = parse_time_string(time_str.strip())
+        if datetime_obj is None:
+            self.failed_count += 1
+            return
+        for i in indices:
+            self.records.time_us[i] = _to_us(datetime_obj)
+        self.joined_count += 1
+
+def scan_results(root='results', pack_dir=PACK_DIR):
+    """扫描 results/ 和分片索引，返回 (CompactRecords, NameLookup)"""
+    duplicates = load_duplicates(root)
+    records = CompactRecords()
+    with os.scandir(root) as it:
+        for entry in it:
+            if not is_result_page(entry.name) or entry.name.split('.')[0] in duplicates:
+                continue
+            mtime_ns = entry.stat().st_mtime_ns
+            flags = 0
+            try:
+                if os.stat(os.path.join(OPTIMIZED_DIR, entry.name)).st_mtime_ns >= mtime_ns:
+                    flags = FLAG_OPTIMIZED
+            except OSError:
+                pass
+            records.append(entry.name, mtime_ns // 1000, flags)
+
+    # 已打包且原始文件已删除的实验（分片索引本身是一个 JSON 文件，会整体读入内存）
+    lookup = NameLookup(records)
+    pack_index = load_pack_index(pack_dir)
+    added_packed = False
+    for name, entry in pack_index['entries'].items():
+        if name in duplicates or lookup.find(name):
+            continue
+        shard = f"{pack_dir}/{entry['shard']}"
+        if shard not in records.shards:
+            records.shards.append(shard)
+        records.append(entry['file'], entry['source_mtime_ns'] // 1000, FLAG_PACKED,
+                       (records.shards.index(shard), entry['offset'], entry['length']))
+        added_packed = True
+    del pack_index
+    if added_packed:
+        lookup = NameLookup(records)
+    return records, lookup
+
+def join_existing_times(records, lookup, index_file="index.html"):
+    """流式解析现有索引，把记录的时间写入 records.time_us"""
+    if not os.path.exists(index_file):
+        print(f"⚠️  现有的 {index_file} 不存在，将使用文件系统时间")
+        return 0
+    parser = IndexTimeJoin(records, lookup)
+    with open(index_file, 'r', encoding='utf-8') as f:
+        for chunk in iter(lambda: f.read(1 << 16), ''):
+            parser.feed(chunk)
+    parser.close()
+    if parser.failed_count:
+        print(f"  ❌ {parser.failed_count} 个时间无法解析")
+    return parser.joined_count
+
+def resolve_times(records, now=None):
+    """按 create_visualization_index 的规则确定显示时间，返回 (保持原时间, 今天更新, 新增) 的数量"""
+    today = (now or datetime.now()).date()
+    today_start = _to_us(datetime.combine(today, datetime.min.time()))
+    tomorrow_start = _to_us(datetime.combine(today + timedelta(days=1), datetime.min.time()))
+    existing_count = updated_today_count = new_count = 0
+    for i in range(len(records)):
+        mtime_us = records.mtime_us[i]
+        recorded_us = records.time_us[i]
+        if recorded_us == NO_TIME:
+            # 新文件：使用文件的修改时间
+            records.time_us[i] = mtime_us
+            new_count += 1
+        elif today_start <= mtime_us < tomorrow_start and mtime_us - recorded_us > MIN_UPDATE_THRESHOLD_US:
+            # 文件在今天被修改过，且时间明显更新：使用今天的修改时间
+            records.time_us[i] = mtime_us
+            updated_today_count += 1
+        else:
+            existing_count += 1
+    return existing_count, updated_today_count, new_count
+
+def sorted_order(records):
+    """按人数升序（未知人数在最后）、同组内按时间从新到旧排序，返回 (序号数组, [(人数, 实验数)])"""
+    counts = {}
+    for g in records.group:
+        counts[g] = counts.get(g, 0) + 1
+    groups = sorted(g for g in counts if g != UNKNOWN_GROUP)
+    if UNKNOWN_GROUP in counts:
+        groups.append(UNKNOWN_GROUP)
+    rank = {g: r for r, g in enumerate(groups)}
+
+    # 人数分组、反向的时间和序号组合成一个整数后原地排序，不为每个实验创建元组或额外的键列表；
+    # 序号在最低位，相同时间保持扫描顺序（与 create_visualization_index 的稳定排序一致）
+    index_bits = len(records).bit_length()
+    group, time_us = records.group, records.time_us
+    keys = [(((rank[group[i]] << 64) + (2 ** 63 - 1 - time_us[i])) << index_bits) | i for i in range(len(records))]
+    keys.sort()
+    index_mask = (1 << index_bits) - 1
+    order = array('q', (key & index_mask for key in keys))
+    del keys
+    return order, [('unknown' if g == UNKNOWN_GROUP else g, counts[g]) for g in groups]
+
+def write_index(records, order, groups, root='results', output_file="index.html"):
+    """逐条渲染并写入临时文件，完成后替换 index.html"""
+    head_html, asset_names = render_page_head(output_file, len(records), len(groups))
+    version = hashlib.sha256()
+    pos = 0
+    with atomic_writer(output_file, buffering=1 << 20) as f:
+        def write(part):
+            f.write(part)
+            version.update(part.encode('utf-8'))
+
+        f.write(head_html)
+        for g, (person_count, count) in enumerate(groups):
+            write(render_group_open(person_count, count, is_first=g == 0))
+            for i in order[pos:pos + count]:
+                filename = records.filename(i)
+                flags = records.flags[i]
+                if flags & FLAG_PACKED:
+                    p = i - records.packed_start
+                    file = view_file = f"{PACK_DIR}/{filename}"
+                    pack_attrs = (f' data-shard="{records.shards[records.pack_shard[p]]}"'
+                                  f' data-offset="{records.pack_offset[p]}" data-length="{records.pack_length[p]}"')
+                else:
+                    file = os.path.join(root, filename)
+                    view_file = os.path.join(OPTIMIZED_DIR, filename) if flags & FLAG_OPTIMIZED else file
+                    pack_attrs = ''
+                write(render_exp_item({
+                    'name': filename.split('.')[0],
+                    'file': file,
+                    'view_file': view_file,
+                    'original_date_str': datetime.fromtimestamp(records.time_us[i] // 1_000_000).strftime('%a %b %d %H:%M:%S %Y'),
+                    'meta_attr': '',
+                    'meta_html': '',
+                    'pack_attrs': pack_attrs,
+                }))
+            write(GROUP_CLOSE)
+            pos += count
+        f.write(PAGE_TAIL_TEMPLATE.format(js_src=asset_names['js'], version=version.hexdigest()[:INDEX_VERSION_LENGTH]))
+
+def peak_rss_mb():
+    """进程的峰值常驻内存 (MB)；无法获取时返回 None
+
+    Linux 上优先读取 /proc/self/status 的 VmHWM：ru_maxrss 在 exec 之后仍保留父进程的峰值，
+    从较大的进程中启动的子进程会报告父进程的内存。
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024  # macOS 单位是字节，Linux 是 KB
+
+def build_index_lowmem(root='results', output_file="index.html"):
+    """低内存模式生成索引页面，返回实验数量"""
+    records, lookup = scan_results(root)
+    print(f"🔍 扫描 {root}: {len(records)} 个实验")
+    if not len(records):
+        return 0
+
+    joined_count = join_existing_times(records, lookup, output_file)
+    del lookup
+    existing_count, updated_today_count, new_count = resolve_times(records)
+    print(f"📖 从现有索引读取 {joined_count} 个时间")
+    print(f"📊 保持原始时间 {existing_count}，今天更新 {updated_today_count}，新增 {new_count}")
+
+    order, groups = sorted_order(records)
+    write_index(records, order, groups, root, output_file)
+    print(f"✅ Updated the index.html: {output_file}")
+    print(f"📊 Total: {len(records)} experiments across {len(groups)} group sizes")
+    return len(records)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="低内存模式生成索引页面（适用于非常大的 results/ 目录）")
+    parser.add_argument('--root', default='results', help="结果目录")
+    parser.add_argument('--output', default='index.html', help="索引页面")
+    parser.add_argument('--budget-mb', type=float, default=DEFAULT_BUDGET_MB, help="峰值内存上限 (MB)，超出时返回非零状态")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.root):
+        print(f"❌ 目录 '{args.root}' 不存在")
+        sys.exit(1)
+    if not build_index_lowmem(args.root, args.output):
+        print(f"❌ 在{args.root}目录中没有找到HTML文件")
+        return
+
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"🧠 峰值内存: {peak:.1f} MB (上限 {args.budget_mb:.0f} MB)")
+        if peak > args.budget_mb:
+            print(f"❌ 峰值内存超出上限")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import socket
+import argparse
+from datetime import datetime
+
+from optimize_plots import atomic_write_text
+from update_html import build_outputs, collect_experiments, parse_existing_index
+
+# 多节点构建：每个节点为自己的 results/ 生成部分清单，合并后在一处渲染索引，结果文件不需要移动
+MANIFEST_DIR = 'manifests'
+MANIFEST_VERSION = 1
+
+# 清单中保存的实验字段（其余字段在合并后由 create_visualization_index 重新计算）
+RECORD_FIELDS = ('name', 'file', 'view_file', 'meta', 'pack_shard', 'pack_offset', 'pack_length')
+
+def _join_url(base_url, path):
+    """节点上的相对路径 -> 合并后的索引中使用的链接"""
+    if not base_url:
+        return path
+    return f"{base_url.rstrip('/')}/{path.replace(os.sep, '/')}"
+
+def build_partial_manifest(root='results', node=None, base_url=None, output=None, index_file=None):
+    """扫描本节点的 results/，生成部分清单并写入 manifests/<节点>.json，返回清单
+
+    每个实验记录:
+        added: 本节点最早见到该实验的时间（上一次清单、本节点的索引和文件修改时间中最早的）
+        updated: 文件的修改时间
+    base_url 是合并后的索引访问本节点结果文件的地址前缀；不指定时保留相对路径。
+    打包的实验由索引页面用带 Range 头的 fetch 读取分片：base_url 与合并后的索引不同源时，
+    本节点的服务器必须允许 CORS（例如 serve_index --cors-origin <索引所在的地址>），否则无法预览。
+    """
+    node = node or socket.gethostname()
+    output = output or os.path.join(MANIFEST_DIR, f"{node}.json")
+
+    experiments = collect_experiments(root)
+    if experiments is None:
+        return None
+
+    previous_added = {}
+    if os.path.exists(output):
+        with open(output, 'r', encoding='utf-8') as f:
+            previous_added = {record['name']: record['added'] for record in json.load(f)['experiments']}
+    # 本节点以前生成过索引时，其中记录的时间也算作添加时间
+    index_times = parse_existing_index(index_file) if index_file else {}
+
+    records = []
+    for exp in experiments:
+        if 'pack_shard' in exp:
+            updated, size = exp['mtime'], exp['pack_length']
+        else:
+            st = os.stat(exp['file'])
+            updated, size = st.st_mtime, st.st_size
+        added = min(t for t in (
+            updated,
+            previous_added.get(exp['name']),
+            index_times[exp['name']].timestamp() if exp['name'] in index_times else None,
+        ) if t is not None)
+
+        record = {key: exp[key] for key in RECORD_FIELDS if key in exp}
+        record['file'] = _join_url(base_url, exp['file'])
+        record['view_file'] = _join_url(base_url, exp.get('view_file', exp['file']))
+        if 'pack_shard' in exp:
+            record['pack_shard'] = _join_url(base_url, exp['pack_shard'])
+        record.update(added=added, updated=updated, size=size)
+        records.append(record)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'node': node,
+        'base_url': base_url,
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'experiments': sorted(records, key=lambda r: r['name']),
+    }
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    atomic_write_text(output, json.dumps(manifest, indent=1, ensure_ascii=False))
+    print(f"🧾 节点 {node}: {len(records)} 个实验 -> {output}")
+    return manifest
+
+def load_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"不支持的清单版本 {manifest.get('version')}: {path}")
+    return manifest
+
+def merge_manifests(manifests):
+    """合并多个节点的清单，返回 (实验列表, {实验名: 最早添加时间})
+
+    同名实验出现在多个节点时，链接和元数据使用最近更新的节点，添加时间取所有节点中最早的。
+    """
+    merged = {}
+    added_times = {}
+    for manifest in manifests:
+        for record in manifest['experiments']:
+            name = record['name']
+            added = datetime.fromtimestamp(record['added'])
+            if name not in added_times or added < added_times[name]:
+                added_times[name] = added
+            if name not in merged or record['updated'] > merged[name]['updated']:
+                merged[name] = dict(record, node=manifest['node'])
+
+    experiments = []
+    for record in merged.values():
+        exp = {key: record[key] for key in RECORD_FIELDS if key in record}
+        exp['meta'] = record.get('meta') or {}
+        exp['mtime'] = record['updated']  # create_visualization_index 用它代替本地文件的修改时间
+        exp['size'] = record['size']
+        exp['node'] = record['node']
+        experiments.append(exp)
+    return experiments, added_times
+
+def build_merged_index(manifest_files, output_file="index.html"):
+    """合并清单并生成索引页面、对比视图和数据集统计"""
+    manifests = [load_manifest(path) for path in manifest_files]
+    experiments, added_times = merge_manifests(manifests)
+    total_records = sum(len(m['experiments']) for m in manifests)
+    print(f"🧾 合并 {len(manifests)} 个节点的清单: {total_records} 条记录 -> {len(experiments)} 个实验")
+    for manifest in manifests:
+        print(f"  🖥️  {manifest['node']}: {len(manifest['experiments'])} 个实验 (生成于 {manifest['generated']})")
+    if not experiments:
+        print("❌ 清单中没有实验")
+        return None
+    build_outputs(experiments, output_file, added_times=added_times)
+    return experiments
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多节点构建：每个节点生成部分清单，合并后生成一个索引页面")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('manifest', help="为本节点的结果目录生成部分清单")
+    build_parser.add_argument('--root', default='results', help="结果目录")
+    build_parser.add_argument('--node', default=None, help="节点名称 (默认使用主机名)")
+    build_parser.add_argument('--base-url', default=None,
+                              help="合并后的索引访问本节点结果文件的地址前缀 (与索引不同源时，"
+                                   "本节点需要用 serve_index --cors-origin 提供文件，打包的实验才能预览)")
+    build_parser.add_argument('--output', default=None, help=f"清单文件 (默认 {MANIFEST_DIR}/<节点>.json)")
+    build_parser.add_argument('--index', default=None, help="本节点以前生成的索引页面，其中的时间作为添加时间")
+
+    merge_parser = subparsers.add_parser('merge', help="合并多个节点的清单并生成索引页面")
+    merge_parser.add_argument('manifests', nargs='*', help=f"清单文件 (默认 {MANIFEST_DIR}/*.json)")
+    merge_parser.add_argument('--output', default='index.html', help="索引页面")
+
+    args = parser.parse_args(argv)
+    if args.command == 'manifest':
+        if build_partial_manifest(args.root, args.node, args.base_url, args.output, args.index) is None:
+            sys.exit(1)
+    else:
+        manifest_files = args.manifests
+        if not manifest_files and os.path.isdir(MANIFEST_DIR):
+            manifest_files = sorted(os.path.join(MANIFEST_DIR, f) for f in os.listdir(MANIFEST_DIR) if f.endswith('.json'))
+        if not manifest_files:
+            print(f"❌ 没有找到清单文件")
+            sys.exit(1)
+        if build_merged_index(manifest_files, args.output) is None:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,305 @@
+import os
+import json
+import hashlib
+import argparse
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+# 优化后的页面输出目录（原始的 results/ 文件保持不变）
+OPTIMIZED_DIR = 'results_optimized'
+MANIFEST_NAME = 'manifest.json'
+
+# 只处理坐标数组，颜色/尺寸等其它数值保持原样
+COORD_KEYS = ('x', 'y', 'z')
+
+# 量化后的数组在浏览器中还原的内联函数（命名函数表达式，不依赖页面中的其它脚本）
+DEQUANT_JS = ("(function dq(o){if(Array.isArray(o))return o.map(dq);"
+              "if(o&&typeof o==='object'){if('__q' in o)return o.__q.map(function(v){return v===null?null:o.o+v*o.s;});"
+              "for(var k in o)o[k]=dq(o[k]);}return o;})")
+
+_decoder = json.JSONDecoder()
+
+def file_sha256(path, chunk_size=1 << 20):
+    """分块计算文件的SHA256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _skip_ws(content, pos):
+    while pos < len(content) and content[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+def find_plotly_calls(content):
+    """查找 Plotly.newPlot / Plotly.addFrames 调用中 JSON 参数的位置
+
+    返回 [(kind, [(start, end, value), ...]), ...]，start/end 为参数在文本中的范围
+    """
+    calls = []
+    for kind, marker, n_args in (('newPlot', 'Plotly.newPlot(', 3), ('addFrames', 'Plotly.addFrames(', 1)):
+        search_from = 0
+        while True:
+            idx = content.find(marker, search_from)
+            if idx < 0:
+                break
+            # 第一个参数是图表div的id（可能是单引号字符串），直接跳到第一个逗号之后
+            pos = content.find(',', idx + len(marker))
+            if pos < 0:
+                break
+            args = []
+            try:
+                for _ in range(n_args):
+                    pos = _skip_ws(content, pos + 1)
+                    value, end = _decoder.raw_decode(content, pos)
+                    args.append((pos, end, value))
+                    pos = _skip_ws(content, end)
+                    if pos >= len(content) or content[pos] != ',':
+                        break
+            except json.JSONDecodeError:
+                pass
+            if args:
+                calls.append((kind, args))
+            search_from = idx + len(marker)
+    return calls
+
+def _quantize(values, bits):
+    """将一维坐标数组量化为整数，返回 {'__q': [...], 's': scale, 'o': offset}"""
+    numbers = [v for v in values if v is not None]
+    if not numbers:
+        return values
+    lo, hi = min(numbers), max(numbers)
+    levels = (1 << bits) - 1
+    scale = (hi - lo) / levels if hi > lo else 1.0
+    return {
+        '__q': [None if v is None else int(round((v - lo) / scale)) for v in values],
+        's': scale,
+        'o': lo,
+    }
+
+def _is_number_list(value):
+    return (isinstance(value, list) and value
+            and all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in value))
+
+def _shrink_coords(obj, decimals=None, quantize_bits=None):
+    """递归处理 trace 中的 x/y/z 坐标数组（四舍五入或整数量化）"""
+    if isinstance(obj, list):
+        return [_shrink_coords(v, decimals, quantize_bits) for v in obj]
+    if not isinstance(obj, dict):
+        return obj
+    result = {}
+    for key, value in obj.items():
+        if key in COORD_KEYS and _is_number_list(value):
+            if quantize_bits:
+                value = _quantize(value, quantize_bits)
+            elif decimals is not None:
+                value = [None if v is None else round(v, decimals) for v in value]
+        else:
+            value = _shrink_coords(value, decimals, quantize_bits)
+        result[key] = value
+    return result
+
+def _decimate_frames(frames, stride):
+    """按步长抽取动画帧，总是保留最后一帧"""
+    if stride <= 1 or len(frames) <= 2:
+        return frames
+    kept = frames[::stride]
+    if kept[-1] is not frames[-1]:
+        kept.append(frames[-1])
+    return kept
+
+def _filter_slider_steps(layout, kept_names):
+    """删除指向已被抽掉的帧的滑块步骤"""
+    for slider in layout.get('sliders', []) or []:
+        steps = slider.get('steps')
+        if not steps:
+            continue
+        kept_steps = []
+        for step in steps:
+            args = step.get('args') or [None]
+            targets = args[0]
+            if isinstance(targets, list) and targets and not all(str(t) in kept_names for t in targets):
+                continue
+            kept_steps.append(step)
+        slider['steps'] = kept_steps
+        if slider.get('active', 0) >= len(kept_steps):
+            slider['active'] = 0
+    return layout
+
+def compact_dumps(value):
+    """紧凑的 JSON 序列化，用于写回页面中的 Plotly 参数"""
+    # 与 plotly 一样转义 "</"，字符串中的 "</script>" 不会提前结束 <script> 元素
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/')
+
+def splice_replacements(content, replacements):
+    """把 [(start, end, text)] 替换到 content 中，返回新的文本"""
+    # 从后往前替换，保证前面的偏移量不变
+    pieces = []
+    last = len(content)
+    for start, end, text in sorted(replacements, reverse=True):
+        pieces.append(content[end:last])
+        pieces.append(text)
+        last = start
+    pieces.append(content[:last])
+    return "".join(reversed(pieces))
+
+def optimize_page(content, stride=1, decimals=None, quantize_bits=None):
+    """重写单个 Plotly 页面的 trace 数据，返回新的页面文本（找不到 Plotly 数据时返回 None）"""
+    calls = find_plotly_calls(content)
+    if not calls:
+        return None
+
+    kept_names = None
+    for kind, args in calls:
+        if kind == 'addFrames' and stride > 1:
+            frames = args[0][2]
+            if isinstance(frames, list):
+                kept = _decimate_frames(frames, stride)
+                kept_names = {str(f.get('name')) for f in kept if isinstance(f, dict)}
+
+    replacements = []
+    for kind, args in calls:
+        for arg_index, (start, end, value) in enumerate(args):
+            if kind == 'addFrames':
+                if stride > 1 and isinstance(value, list):
+                    value = _decimate_frames(value, stride)
+                text = compact_dumps(_shrink_coords(value, decimals, quantize_bits))
+            elif arg_index == 0:
+                text = compact_dumps(_shrink_coords(value, decimals, quantize_bits))
+            elif arg_index == 1 and kept_names is not None and isinstance(value, dict):
+                text = compact_dumps(_filter_slider_steps(value, kept_names))
+            else:
+                continue
+            if quantize_bits and arg_index == 0:
+                text = f"{DEQUANT_JS}({text})"
+            replacements.append((start, end, text))
+
+    return splice_replacements(content, replacements)
+
+def is_result_page(file):
+    """results/ 中的结果页面；跳过隐藏文件（包括中断或并发写入时留下的 atomic_writer 临时文件）"""
+    return file.endswith('.html') and not file.startswith('.')
+
+@contextmanager
+def atomic_writer(path, buffering=-1):
+    """以文本方式写入临时文件，正常结束后 rename 为目标文件，避免中断时留下半个文件
+
+    临时文件是以 .tmp 结尾的隐藏文件，扫描 results/ 时不会被当作结果页面。
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', buffering=buffering) as f:
+            yield f
+        os.chmod(tmp_path, 0o644)  # mkstemp 默认只有属主可读写
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_text(path, text):
+    """先写临时文件再 rename，避免中断时留下半个文件"""
+    with atomic_writer(path) as f:
+        f.write(text)
+
+def load_manifest(output_dir=OPTIMIZED_DIR):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  无法读取优化清单 {path}: {e}")
+        return {}
+
+def save_manifest(manifest, output_dir=OPTIMIZED_DIR):
+    atomic_write_text(os.path.join(output_dir, MANIFEST_NAME),
+                      json.dumps(manifest, indent=2, ensure_ascii=False, sort_keys=True))
+
+def optimize_results(root='results', output_dir=OPTIMIZED_DIR, stride=1, decimals=3, quantize_bits=None, force=False):
+    """优化 results/ 下的所有页面，写入 output_dir；源文件哈希和参数都未变化的文件直接跳过"""
+    if not os.path.exists(root):
+        print(f"❌ 目录 '{root}' 不存在")
+        return {}
+    os.makedirs(output_dir, exist_ok=True)
+
+    options = {'stride': stride, 'decimals': decimals, 'quantize_bits': quantize_bits}
+    manifest = load_manifest(output_dir)
+    optimized_count = skipped_count = failed_count = 0
+
+    print(f"🔧 优化结果页面: {root} -> {output_dir} (参数: {options})")
+
+    for file in sorted(os.listdir(root)):
+        if not is_result_page(file):
+            continue
+        src = os.path.join(root, file)
+        dst = os.path.join(output_dir, file)
+        source_hash = file_sha256(src)
+
+        entry = manifest.get(file)
+        if (not force and entry and entry.get('source_sha256') == source_hash
+                and entry.get('options') == options and os.path.exists(dst)):
+            skipped_count += 1
+            continue
+
+        with open(src, 'r', encoding='utf-8') as f:
+            content = f.read()
+        optimized = optimize_page(content, stride=stride, decimals=decimals, quantize_bits=quantize_bits)
+        if optimized is None:
+            print(f"  ⚠️  未找到Plotly数据，跳过: {file}")
+            failed_count += 1
+            continue
+
+        atomic_write_text(dst, optimized)
+        original_bytes = len(content.encode('utf-8'))
+        optimized_bytes = len(optimized.encode('utf-8'))
+        manifest[file] = {
+            'source_sha256': source_hash,
+            'options': options,
+            'original_bytes': original_bytes,
+            'optimized_bytes': optimized_bytes,
+            'reduction_ratio': round(original_bytes / optimized_bytes, 3) if optimized_bytes else None,
+            'optimized_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        optimized_count += 1
+        print(f"  ✅ {file}: {original_bytes / 1024:.1f} KB -> {optimized_bytes / 1024:.1f} KB "
+              f"(x{manifest[file]['reduction_ratio']})")
+
+    # 删除源文件已不存在的清单条目及其输出
+    for file in list(manifest):
+        if not os.path.exists(os.path.join(root, file)):
+            stale = os.path.join(output_dir, file)
+            if os.path.exists(stale):
+                os.remove(stale)
+            del manifest[file]
+
+    save_manifest(manifest, output_dir)
+
+    total_original = sum(e['original_bytes'] for e in manifest.values())
+    total_optimized = sum(e['optimized_bytes'] for e in manifest.values())
+    print(f"📊 优化: {optimized_count}，缓存命中: {skipped_count}，失败: {failed_count}")
+    if total_optimized:
+        print(f"📉 总大小: {total_original / 1024 / 1024:.2f} MB -> {total_optimized / 1024 / 1024:.2f} MB "
+              f"(x{total_original / total_optimized:.2f})")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="对 results/ 中的Plotly页面进行帧抽取和精度压缩")
+    parser.add_argument('--root', default='results', help="原始结果目录")
+    parser.add_argument('--output-dir', default=OPTIMIZED_DIR, help="优化后页面的输出目录")
+    parser.add_argument('--stride', type=int, default=1, help="动画帧抽取步长 (1 = 保留所有帧)")
+    parser.add_argument('--decimals', type=int, default=3, help="坐标保留的小数位数")
+    parser.add_argument('--quantize-bits', type=int, default=None,
+                        help="将坐标量化为指定位数的整数 (配合 scale/offset 还原)，设置后忽略 --decimals")
+    parser.add_argument('--force', action='store_true', help="忽略缓存，重新优化所有页面")
+    args = parser.parse_args()
+
+    optimize_results(args.root, args.output_dir, stride=args.stride, decimals=args.decimals,
+                     quantize_bits=args.quantize_bits, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import hashlib
+import argparse
+
+from optimize_plots import atomic_write_text, is_result_page
+
+# 打包存储：结果页面依次拼接到较大的分片文件中，旁边的 index.json 记录每个页面的偏移和长度
+PACK_DIR = 'packed'
+PACK_INDEX = 'index.json'
+SHARD_TEMPLATE = 'shard-{:05d}.bin'
+SHARD_PATTERN = re.compile(r'shard-(\d+)\.bin$')
+# 分片和索引一起提交到 git，由 GitHub Pages 提供给页面的 Range 请求；GitHub 拒绝超过 100 MB 的文件
+DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+MAX_SHARD_MB = 90
+
+def load_pack_index(pack_dir=PACK_DIR):
+    """读取分片索引，返回 {'shards': [...], 'entries': {name: {...}}}"""
+    path = os.path.join(pack_dir, PACK_INDEX)
+    if not os.path.exists(path):
+        return {'shards': [], 'entries': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_pack_index(pack_index, pack_dir=PACK_DIR):
+    atomic_write_text(os.path.join(pack_dir, PACK_INDEX),
+                      json.dumps(pack_index, indent=1, ensure_ascii=False, sort_keys=True))
+
+def next_shard_name(shards):
+    """分片编号只增不减，新分片不会与现有（或整理前的旧）分片重名"""
+    numbers = [int(m.group(1)) for m in map(SHARD_PATTERN.match, shards) if m]
+    return SHARD_TEMPLATE.format(max(numbers) + 1 if numbers else 0)
+
+def read_entry(name, pack_dir=PACK_DIR, pack_index=None):
+    """按偏移从分片中读取一个页面的字节内容；不存在时返回 None"""
+    pack_index = pack_index or load_pack_index(pack_dir)
+    entry = pack_index['entries'].get(name)
+    if entry is None:
+        return None
+    with open(os.path.join(pack_dir, entry['shard']), 'rb') as f:
+        f.seek(entry['offset'])
+        return f.read(entry['length'])
+
+def pack_results(root='results', pack_dir=PACK_DIR, shard_bytes=DEFAULT_SHARD_BYTES, remove_sources=False):
+    """把 results/ 中新增或修改过的页面追加到分片中
+
+    未变化的页面（大小和修改时间相同）直接跳过；修改过的页面追加新副本，旧副本留在分片中，
+    可以用 compact_pack() 回收空间。
+    """
+    os.makedirs(pack_dir, exist_ok=True)
+    pack_index = load_pack_index(pack_dir)
+    shards = pack_index['shards']
+    entries = pack_index['entries']
+
+    def open_shard():
+        if not shards:
+            shards.append(next_shard_name(shards))
+        path = os.path.join(pack_dir, shards[-1])
+        if os.path.exists(path) and os.path.getsize(path) >= shard_bytes:
+            shards.append(next_shard_name(shards))
+            path = os.path.join(pack_dir, shards[-1])
+        return open(path, 'ab')
+
+    added_count = skipped_count = 0
+    shard = open_shard()
+    try:
+        for file in sorted(os.listdir(root)):
+            if not is_result_page(file):
+                continue
+            src = os.path.join(root, file)
+            name = file.split('.')[0]
+            st = os.stat(src)
+            entry = entries.get(name)
+            if entry and entry['source_size'] == st.st_size and entry['source_mtime_ns'] == st.st_mtime_ns:
+                skipped_count += 1
+                continue
+
+            with open(src, 'rb') as f:
+                data = f.read()
+            # 写入后会超过上限时换到新分片（单个页面本身超过上限时独占一个分片）
+            if shard.tell() and shard.tell() + len(data) > shard_bytes:
+                shard.close()
+                shards.append(next_shard_name(shards))
+                shard = open(os.path.join(pack_dir, shards[-1]), 'ab')
+            offset = shard.tell()
+            shard.write(data)
+            entries[name] = {
+                'shard': shards[-1],
+                'offset': offset,
+                'length': len(data),
+                'sha256': hashlib.sha256(data).hexdigest(),
+                'file': file,
+                'source_size': st.st_size,
+                'source_mtime_ns': st.st_mtime_ns,
+            }
+            added_count += 1
+    finally:
+        shard.close()
+
+    # 分片写入完成后再更新索引，中断时最多在分片末尾留下未被引用的数据
+    save_pack_index(pack_index, pack_dir)
+
+    if remove_sources:
+        for name, entry in entries.items():
+            src = os.path.join(root, entry['file'])
+            if os.path.exists(src) and os.stat(src).st_mtime_ns == entry['source_mtime_ns']:
+                os.remove(src)
+
+    total_bytes = sum(os.path.getsize(os.path.join(pack_dir, s)) for s in shards)
+    print(f"📦 打包: 新增/更新 {added_count} 个页面，未变化 {skipped_count} 个；"
+          f"{len(shards)} 个分片，共 {total_bytes / 1024 / 1024:.2f} MB")
+    return pack_index
+
+def compact_pack(pack_dir=PACK_DIR, shard_bytes=DEFAULT_SHARD_BYTES):
+    """重写分片，去掉已被新版本替换的旧数据
+
+    新数据写入新编号的分片，保存索引之后才删除旧分片；任何时刻中断，索引引用的分片都完整存在。
+    """
+    pack_index = load_pack_index(pack_dir)
+    old_shards = pack_index['shards']
+    new_shards = []
+    new_entries = {}
+    out = None
+    try:
+        for name, entry in sorted(pack_index['entries'].items()):
+            data = read_entry(name, pack_dir, pack_index)
+            if out is None or (out.tell() and out.tell() + len(data) > shard_bytes):
+                if out is not None:
+                    out.close()
+                new_shards.append(next_shard_name(old_shards + new_shards))
+                out = open(os.path.join(pack_dir, new_shards[-1]), 'wb')
+            new_entries[name] = dict(entry, shard=new_shards[-1], offset=out.tell())
+            out.write(data)
+    finally:
+        if out is not None:
+            out.close()
+
+    save_pack_index({'shards': new_shards, 'entries': new_entries}, pack_dir)
+    for shard in old_shards:
+        path = os.path.join(pack_dir, shard)
+        if os.path.exists(path):
+            os.remove(path)
+    print(f"🧹 整理完成: {len(old_shards)} -> {len(new_shards)} 个分片")
+
+def remove_entries(names, pack_dir=PACK_DIR):
+    """从分片索引中删除实验（数据留在分片中，由 compact_pack() 回收），返回删除的数量"""
+    pack_index = load_pack_index(pack_dir)
+    removed = [name for name in names if pack_index['entries'].pop(name, None) is not None]
+    if removed:
+        save_pack_index(pack_index, pack_dir)
+    return len(removed)
+
+def packed_experiments(pack_dir=PACK_DIR, exclude=()):
+    """把分片中的页面转换为索引构建使用的实验列表（用于源文件已删除的情况）"""
+    experiments = []
+    pack_index = load_pack_index(pack_dir)
+    for name, entry in pack_index['entries'].items():
+        if name in exclude:
+            continue
+        experiments.append({
+            'name': name,
+            'file': f"{pack_dir}/{entry['file']}",  # 由预览服务器从分片中提供
+            'mtime': entry['source_mtime_ns'] / 1e9,
+            'size': entry['length'],
+            'pack_shard': f"{pack_dir}/{entry['shard']}",
+            'pack_offset': entry['offset'],
+            'pack_length': entry['length'],
+        })
+    return experiments
+
+def main():
+    parser = argparse.ArgumentParser(description="把 results/ 中的页面打包为带偏移索引的大分片文件")
+    parser.add_argument('--root', default='results', help="结果目录")
+    parser.add_argument('--pack-dir', default=PACK_DIR, help="分片输出目录")
+    parser.add_argument('--shard-mb', type=int, default=DEFAULT_SHARD_BYTES // 1024 // 1024,
+                        help=f"单个分片的大小上限 (MB，不超过 {MAX_SHARD_MB}，GitHub 拒绝超过 100 MB 的文件)")
+    parser.add_argument('--remove-sources', action='store_true', help="打包后删除 results/ 中已打包的原始文件")
+    parser.add_argument('--compact', action='store_true', help="重写分片，回收旧版本占用的空间")
+    args = parser.parse_args()
+    if not 1 <= args.shard_mb <= MAX_SHARD_MB:
+        parser.error(f"--shard-mb 必须在 1 到 {MAX_SHARD_MB} 之间")
+
+    shard_bytes = args.shard_mb * 1024 * 1024
+    if args.compact:
+        compact_pack(args.pack_dir, shard_bytes)
+    elif not os.path.exists(args.root):
+        print(f"❌ 目录 '{args.root}' 不存在")
+    else:
+        pack_results(args.root, args.pack_dir, shard_bytes, args.remove_sources)
+
+if __name__ == "__main__":
+    main()
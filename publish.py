@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+from dedup_results import DUPLICATES_FILE, load_duplicates
+from retention import apply_retention
+from serve_index import PRECOMPRESSED
+from sidecars import SIDECAR_CACHE
+from transform_results import TRANSFORM_MANIFEST
+from update_html import build_outputs, collect_experiments
+
+UPLOAD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'upload_hugging.py')
+
+class CommandError(Exception):
+    """子进程超时或返回非零状态"""
+
+async def run_command(args, cwd=None, timeout=300, retries=0, retry_delay=2.0):
+    """异步运行子进程，超时后终止；失败时按指数退避重试，返回 (returncode, 输出)"""
+    attempt = 0
+    while True:
+        attempt += 1
+        proc = await asyncio.create_subprocess_exec(
+            *args, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+        )
+        try:
+            output, _ = await asyncio.wait_for(proc.communicate(), timeout)
+            output = output.decode('utf-8', errors='replace')
+            if proc.returncode == 0:
+                return proc.returncode, output
+            error = CommandError(f"{' '.join(args)} 返回 {proc.returncode}: {output.strip()[-500:]}")
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            error = CommandError(f"{' '.join(args)} 超时 ({timeout} 秒)")
+
+        if attempt > retries:
+            raise error
+        delay = retry_delay * 2 ** (attempt - 1)
+        print(f"  ⚠️  {error}，{delay:.0f} 秒后重试 ({attempt}/{retries})")
+        await asyncio.sleep(delay)
+
+async def git_publish(repo_dir, message, timeout=120, retries=2):
+    """git add / commit / push；没有改动时跳过提交，只有 push 会重试"""
+    await run_command(["git", "add", "."], cwd=repo_dir, timeout=timeout)
+    proc = await asyncio.create_subprocess_exec("git", "diff", "--cached", "--quiet", cwd=repo_dir)
+    if await proc.wait() == 0:
+        print("  ℹ️  没有需要提交的改动")
+    else:
+        await run_command(["git", "commit", "-m", message], cwd=repo_dir, timeout=timeout)
+    await run_command(["git", "push"], cwd=repo_dir, timeout=timeout, retries=retries)
+
+async def hub_upload(root, repo_id=None, timeout=1800, retries=2):
+    """在子进程中运行 upload_hugging.py（可以被超时终止），跳过去重记录中的重复文件
+
+    本地使用的记录文件（去重、变换、元数据缓存）、预压缩副本和写入中的临时文件不上传。
+    """
+    args = [sys.executable, UPLOAD_SCRIPT, "--folder", root]
+    if repo_id:
+        args += ["--repo-id", repo_id]
+    for name in load_duplicates(root):
+        args += ["--ignore", f"{name}.html"]
+    patterns = [DUPLICATES_FILE, TRANSFORM_MANIFEST, SIDECAR_CACHE, '*.tmp']
+    patterns += [f"*{suffix}" for _, suffix in PRECOMPRESSED]
+    for pattern in patterns:
+        args += ["--ignore", pattern]
+    await run_command(args, timeout=timeout, retries=retries)
+
+async def _timed(name, coro, timings):
+    """运行一个发布目标并记录耗时和结果"""
+    start = time.perf_counter()
+    try:
+        await coro
+        timings[name] = (time.perf_counter() - start, None)
+        print(f"  ✅ {name} 完成 ({timings[name][0]:.1f} 秒)")
+    except Exception as e:
+        timings[name] = (time.perf_counter() - start, e)
+        print(f"  ❌ {name} 失败 ({timings[name][0]:.1f} 秒): {e}")
+
+async def publish(root='results', repo_dir='./', output_file='index.html', hf_repo_id=None, upload_dir=None,
+                  skip_git=False, skip_hub=False, git_timeout=120, hub_timeout=1800, retries=2):
+    """生成索引的同时上传结果文件到 Hugging Face，索引生成完成后推送到 GitHub"""
+    apply_retention(root)
+    experiments = collect_experiments(root)
+    if not experiments:
+        print(f"❌ 在{root}目录中没有找到HTML文件")
+        return {}
+
+    timings = {}
+    tasks = []
+    # 结果文件在生成索引前就已经存在，可以立即开始上传
+    if not skip_hub:
+        tasks.append(asyncio.create_task(_timed('huggingface', hub_upload(upload_dir or root, hf_repo_id, hub_timeout, retries), timings)))
+
+    await _timed('index', asyncio.to_thread(build_outputs, experiments, output_file), timings)
+    if timings['index'][1] is None and not skip_git:
+        today = datetime.now().strftime('%Y-%m-%d')
+        message = f"更新可视化索引页面 - 改为按人数分组 ({today})"
+        tasks.append(asyncio.create_task(_timed('github', git_publish(repo_dir, message, git_timeout, retries), timings)))
+
+    await asyncio.gather(*tasks)
+
+    print(f"\n⏱️  发布耗时:")
+    for name, (elapsed, error) in timings.items():
+        status = "❌" if error else "✅"
+        print(f"  {status} {name:<12} {elapsed:8.1f} 秒")
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="并行生成索引、推送GitHub和上传Hugging Face")
+    parser.add_argument('--root', default='results', help="结果目录")
+    parser.add_argument('--repo-dir', default='./', help="GitHub仓库目录")
+    parser.add_argument('--hf-repo-id', default=None, help="Hugging Face 数据集仓库 (默认使用 upload_hugging.py 中的设置)")
+    parser.add_argument('--upload-dir', default=None, help="上传到Hugging Face的目录 (默认与 --root 相同；打包存储时可指定 packed)")
+    parser.add_argument('--skip-git', action='store_true', help="不推送到GitHub")
+    parser.add_argument('--skip-hub', action='store_true', help="不上传到Hugging Face")
+    parser.add_argument('--git-timeout', type=float, default=120, help="每个git命令的超时时间（秒）")
+    parser.add_argument('--hub-timeout', type=float, default=1800, help="上传的超时时间（秒）")
+    parser.add_argument('--retries', type=int, default=2, help="push/上传失败后的重试次数")
+    args = parser.parse_args(argv)
+
+    timings = asyncio.run(publish(
+        args.root, args.repo_dir, hf_repo_id=args.hf_repo_id, upload_dir=args.upload_dir, skip_git=args.skip_git, skip_hub=args.skip_hub,
+        git_timeout=args.git_timeout, hub_timeout=args.hub_timeout, retries=args.retries,
+    ))
+    if any(error for _, error in timings.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
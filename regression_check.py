@@ -0,0 +1,445 @@
+import os
+import io
+import sys
+import json
+import time
+import re
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime
+
+# 回归检查：生成固定的 results/ 目录和旧版索引，验证分组、时间保留和页面输出没有变化，
+# 同时记录每个规模的构建耗时和峰值内存，超出上限时失败
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regression_golden.json')
+
+# 固定的起始时间 (2025-03-01 00:00:00 UTC)，所有文件时间都早于今天，输出与运行日期无关
+BASE_EPOCH = 1740787200
+
+# 名称 -> (实验数, 旧索引格式)
+#   old: update_html_old.py 生成的按日期分组页面
+#   h3: 最早的 <h3> + <p><strong>Time added:</strong> 格式
+#   current: 当前 create_visualization_index 生成的页面
+#   none: 没有旧索引
+FIXTURES = {
+    'small-none': (60, 'none'),
+    'small-h3': (60, 'h3'),
+    'small-old': (60, 'old'),
+    'medium-old': (2000, 'old'),
+    'medium-current': (2000, 'current'),
+    'large-old': (20000, 'old'),
+}
+
+# 每个规模、每种构建的 (耗时上限 秒, 峰值内存上限 MB)，在子进程中测量，包含解释器本身约 20 MB
+# 完整构建会把整个页面拼成一个字符串（含 emoji，按 4 字节/字符存储），内存随实验数线性增长
+CEILINGS = {
+    'small': {'index': (5, 60), 'lowmem': (5, 40)},
+    'medium': {'index': (10, 80), 'lowmem': (10, 40)},
+    'large': {'index': (30, 300), 'lowmem': (30, 60)},
+}
+
+BUILDS = ('index', 'lowmem')
+
+# (文件名, 期望人数)
+PERSON_COUNT_CASES = [
+    ('gdance_sample_test_p3_cAll_sBM_c01_d17_mBM3_ch04_0_0_120_ckptA', 3),
+    ('gdance_sample_val_p12_vid0001_2_30_150_ckptB', 12),
+    ('duet_person2', 2),
+    ('run_person2_p3_extra', 2),       # _person 优先于 _p{n}_
+    ('model_p5_demo', 5),
+    ('trio_person7demo', 7),
+    ('gdance_sample_test_px_vid_0_0_1_a', None),
+    ('custom_experiment', None),
+    ('p4', None),
+]
+
+def _fmt(epoch):
+    return datetime.fromtimestamp(epoch).strftime('%a %b %d %H:%M:%S %Y')
+
+def fixture_names(size, rng):
+    """覆盖所有人数命名规则和无法识别人数的实验名"""
+    names = []
+    for i in range(size):
+        p = rng.randrange(2, 7)
+        kind = i % 8
+        if kind < 5:
+            split = rng.choice(('test', 'val'))
+            video = rng.choice((f"vid{i // 10:04d}", f"cAll_sBM_c0{p}_d{i % 30}_mBM{p}_ch0{kind}"))
+            names.append(f"gdance_sample_{split}_p{p}_{video}_{i}_{i * 10}_{i * 10 + 120}_{rng.choice(('ckptA', 'ckptB'))}")
+        elif kind == 5:
+            names.append(f"duet_{i}_person{p}")
+        elif kind == 6:
+            names.append(f"group{i}person{p}demo")
+        else:
+            names.append(f"custom_experiment_{i}")
+    return names
+
+def make_fixture(fixture_dir, size, legacy_format, seed=0):
+    """生成 results/ 和 legacy_index.html，返回每个实验期望显示的时间戳 {name: epoch}"""
+    rng = random.Random(seed)
+    results = os.path.join(fixture_dir, 'results')
+    os.makedirs(results)
+    names = fixture_names(size, rng)
+
+    # 每个实验的修改时间互不相同（相同时间的排序取决于目录遍历顺序）
+    mtimes = [BASE_EPOCH + i * 61 + rng.randrange(60) for i in range(size)]
+    rng.shuffle(mtimes)
+    # 一半的实验在旧索引中有更早的记录时间，重新生成后应该保留
+    recorded = {}
+    if legacy_format != 'none':
+        recorded = {name: mtime - rng.randrange(1, 30 * 86400) for name, mtime in zip(names, mtimes) if rng.random() < 0.5}
+
+    for name, mtime in zip(names, mtimes):
+        path = os.path.join(results, f"{name}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"<html><body>{name}</body></html>\n")
+        # 旧索引按记录时间生成
+        os.utime(path, (recorded.get(name, mtime),) * 2)
+
+    legacy_file = os.path.join(fixture_dir, 'legacy_index.html')
+    if legacy_format == 'h3':
+        with open(legacy_file, 'w', encoding='utf-8') as f:
+            f.write("<html><body><h1>Experiments</h1>\n")
+            for name, epoch in recorded.items():
+                f.write(f"<div class=\"exp\"><h3>{name}</h3>\n<p><strong>Time added:</strong> {_fmt(epoch)}</p>\n"
+                        f"<a href=\"results/{name}.html\">open</a></div>\n")
+            f.write("</body></html>\n")
+    elif legacy_format in ('old', 'current'):
+        if legacy_format == 'old':
+            import update_html_old as generator
+        else:
+            import update_html as generator
+        cwd = os.getcwd()
+        os.chdir(fixture_dir)
+        try:
+            experiments = [{'name': name, 'file': f"results/{name}.html"} for name in recorded]
+            with redirect_stdout(io.StringIO()):
+                generator.create_visualization_index(experiments, 'legacy_index.html')
+        finally:
+            os.chdir(cwd)
+
+    for name, mtime in zip(names, mtimes):
+        os.utime(os.path.join(results, f"{name}.html"), (mtime, mtime))
+    return {name: recorded.get(name, mtime) for name, mtime in zip(names, mtimes)}, recorded
+
+def normalize_page(page):
+    """静态资源文件名带内容哈希，修改样式/脚本不应导致页面比较失败"""
+    return re.sub(r'index\.[0-9a-f]{10}\.(css|js)', r'index.ASSET.\1', page)
+
+def run_build(kind, fixture_dir):
+    """在子进程中运行一次构建，返回 {'seconds', 'peak_mb'}；页面写入 fixture_dir/index.html"""
+    # 每次构建都从旧索引开始，不能读到上一次构建写出的页面
+    legacy_file = os.path.join(fixture_dir, 'legacy_index.html')
+    index_file = os.path.join(fixture_dir, 'index.html')
+    if os.path.exists(legacy_file):
+        shutil.copyfile(legacy_file, index_file)
+    elif os.path.exists(index_file):
+        os.remove(index_file)
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-build', kind, fixture_dir],
+        capture_output=True, text=True, env=dict(os.environ, TZ='UTC'),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{kind} 构建失败:\n{proc.stderr.strip()[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def _child_build(kind, fixture_dir):
+    """子进程入口：构建并输出耗时和峰值内存"""
+    os.chdir(fixture_dir)
+    from lowmem_build import build_index_lowmem, peak_rss_mb
+    from update_html import collect_experiments, create_visualization_index
+
+    # 构建日志直接丢弃，不在内存中累积（否则会计入峰值内存）
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        if kind == 'index':
+            create_visualization_index(collect_experiments('results'), 'index.html')
+        else:
+            build_index_lowmem('results', 'index.html')
+    print(json.dumps({'seconds': time.perf_counter() - start, 'peak_mb': peak_rss_mb()}))
+
+def check_page(page, expected_times):
+    """页面中每个实验的分组和 Added 时间是否符合预期，返回错误列表"""
+    from update_html import IndexTimeParser, extract_person_count
+
+    parser = IndexTimeParser()
+    parser.feed(page)
+    parser.close()
+    errors = []
+    rendered = {name: time_str for name, time_str, _ in parser.pairs}
+    for name, epoch in expected_times.items():
+        if name not in rendered:
+            errors.append(f"缺少实验 {name}")
+        elif rendered[name] != _fmt(epoch):
+            errors.append(f"{name}: 时间 {rendered[name]} != 期望 {_fmt(epoch)}")
+    if len(parser.pairs) != len(expected_times):
+        errors.append(f"页面中有 {len(parser.pairs)} 个实验，期望 {len(expected_times)} 个")
+
+    # 分组标题中的人数和实验数
+    groups = {}
+    for name in expected_times:
+        count = extract_person_count(name)
+        key = 'unknown' if count is None else str(count)
+        groups[key] = groups.get(key, 0) + 1
+    for key, count in groups.items():
+        header = (f"❓ Unknown Group Size ({count} experiments)" if key == 'unknown'
+                  else f"👥 {key} People ({count} experiments)")
+        if header not in page:
+            errors.append(f"缺少分组标题: {header}")
+    return errors, groups
+
+def check_person_counts():
+    from update_html import extract_person_count
+    return [f"extract_person_count({name!r}) = {extract_person_count(name)!r}，期望 {expected!r}"
+            for name, expected in PERSON_COUNT_CASES if extract_person_count(name) != expected]
+
+def check_parse_existing_index(fixture_dir, recorded):
+    """parse_existing_index 必须找回旧索引中的每一个记录时间"""
+    from update_html import parse_existing_index
+
+    legacy_file = os.path.join(fixture_dir, 'legacy_index.html')
+    if not recorded:
+        return []
+    with redirect_stdout(io.StringIO()):
+        parsed = parse_existing_index(legacy_file)
+    errors = [f"丢失记录时间: {name}" for name in recorded if name not in parsed]
+    errors += [f"{name}: 解析时间 {parsed[name]} != {datetime.fromtimestamp(epoch)}"
+               for name, epoch in recorded.items() if name in parsed and parsed[name] != datetime.fromtimestamp(epoch)]
+    errors += [f"多出的实验: {name}" for name in parsed if name not in recorded]
+    return errors
+
+def check_updated_today(work_dir):
+    """今天修改且比记录时间晚超过 1 秒的文件使用新的修改时间，其它情况保留记录时间"""
+    from update_html import create_visualization_index
+
+    fixture_dir = os.path.join(work_dir, 'updated-today')
+    results = os.path.join(fixture_dir, 'results')
+    os.makedirs(results)
+    now = int(time.time())
+    cases = {
+        # 名称: (记录时间, 修改时间, 期望时间)
+        'today_p2_updated': (now - 3600, now - 5, now - 5),
+        'today_p2_within_threshold': (now - 6, now - 5.5, now - 6),
+        'old_p2_kept': (BASE_EPOCH, BASE_EPOCH + 86400, BASE_EPOCH),
+    }
+    with open(os.path.join(fixture_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        for name, (recorded, _, _) in cases.items():
+            f.write(f'<div class="exp-name">{name}</div><span class="exp-time">Added: {_fmt(recorded)}</span>\n')
+    for name, (_, mtime, _) in cases.items():
+        path = os.path.join(results, f"{name}.html")
+        open(path, 'w').close()
+        os.utime(path, (mtime, mtime))
+
+    experiments = [{'name': name, 'file': os.path.join(results, f"{name}.html")} for name in cases]
+    with redirect_stdout(io.StringIO()):
+        create_visualization_index(experiments, os.path.join(fixture_dir, 'index.html'))
+    with open(os.path.join(fixture_dir, 'index.html'), encoding='utf-8') as f:
+        errors, _ = check_page(f.read(), {name: expected for name, (_, _, expected) in cases.items()})
+    return errors
+
+# 数据集统计：100k 个片段的批量解析和统计（不含 stat）取 3 次中最快的一次，与同一台机器上
+# 逐个调用 extract_person_count / parse_clip_name（旧实现中只占一部分的解析循环）的最快耗时比较，
+# 不能超过它的 STATS_CEILING_RATIO 倍；按机器速度缩放，避免固定秒数在慢机器或负载高时误报
+STATS_CLIPS = 100000
+STATS_CEILING_RATIO = 1.5
+STATS_REPEAT = 3
+
+def _best_time(func, repeat=STATS_REPEAT):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def check_dataset_stats():
+    """批量解析的结果必须与逐个调用 extract_person_count / parse_clip_name 相同，并且满足耗时上限
+
+    返回 (错误列表, 最快耗时)；没有安装 NumPy 时返回 (None, None)
+    """
+    try:
+        from dataset_stats import build_records, compute_stats, parse_names
+    except ImportError:
+        return None, None
+    from update_html import extract_person_count, parse_clip_name
+
+    names = fixture_names(STATS_CLIPS, random.Random(0)) + [name for name, _ in PERSON_COUNT_CASES]
+    records = parse_names(names)
+    errors = []
+    for i, name in enumerate(names):
+        count = extract_person_count(name)
+        clip = parse_clip_name(name) or {'start_frame': -1, 'end_frame': -1, 'split': '', 'video_id': ''}
+        expected = (-1 if count is None else count, clip['start_frame'], clip['end_frame'], clip['split'], clip['video_id'])
+        actual = (int(records['person'][i]), int(records['start'][i]), int(records['end'][i]),
+                  str(records['split'][i]), str(records['video'][i]))
+        if actual != expected:
+            errors.append(f"parse_names({name!r}) = {actual}，期望 {expected}")
+
+    experiments = [{'name': name, 'file': name + '.html', 'size': 1000 + i, 'meta': {}}
+                   for i, name in enumerate(names[:STATS_CLIPS])]
+    calibration_names = names[:STATS_CLIPS]
+
+    def per_name():
+        for name in calibration_names:
+            extract_person_count(name)
+            parse_clip_name(name)
+
+    seconds = _best_time(lambda: compute_stats(build_records(experiments)))
+    ceiling = _best_time(per_name) * STATS_CEILING_RATIO
+    if seconds > ceiling:
+        errors.append(f"{STATS_CLIPS} 个片段的统计耗时 {seconds:.2f} 秒超出上限 {ceiling:.2f} 秒"
+                      f"（逐个解析耗时的 {STATS_CEILING_RATIO} 倍）")
+    return errors[:10], seconds
+
+# transform_results 的输出不能依赖分块大小（包括把 <pre> 放在块边界附近的情况）
+TRANSFORM_CHUNK_SIZES = (1, 2, 3, 7, 50, 1 << 20)
+
+def transform_fixture_page():
+    """带缩进/空行/CRLF、内联 plotly.js、含 "</script>" 字符串的数据和 <pre> 的结果页面"""
+    data = json.dumps([{'x': [1.5, 2.25], 'y': [3, 4], 'name': 'a</script>b'}], indent=2).replace('</', '<\\/')
+    return (
+        "<html>\n  <head>\n\n   \n    <title>p3 clip</title>\r\n  </head>\r\n  <body>\r\n\r\n"
+        "    <div>\n      <script type=\"text/javascript\">/**\n* plotly.js v2.27.0\n*/\n"
+        "var Plotly = {newPlot: function () {}};\n</script>\n"
+        "      <script type=\"text/javascript\">\n        Plotly.newPlot(\"plot\", " + data + ", {\"title\": \"t\"})\n"
+        "      </script>\n\n\n    </div>\n" + " " * 37 + "<PRE class=\"log\">\n   keep\n\n     this\n</PRE>\n"
+        "    <p>after</p>\n  </body>\n</html>\n"
+    )
+
+def check_transform_chunking(work_dir):
+    """不同分块大小的变换输出必须相同；<pre> 内容保持原样，"</" 保持转义"""
+    from transform_results import TRANSFORMS, iter_events, read_chunks, render_event
+
+    path = os.path.join(work_dir, 'transform.html')
+    page = transform_fixture_page()
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(page)
+
+    outputs = {}
+    for chunk_size in TRANSFORM_CHUNK_SIZES:
+        events = iter_events(read_chunks(path, chunk_size))
+        for transform in TRANSFORMS.values():
+            events = transform(events, {})
+        outputs[chunk_size] = ''.join(render_event(event) for event in events)
+
+    errors = [f"分块大小 {chunk_size}: 输出 {len(output)} 字节，与分块大小 {TRANSFORM_CHUNK_SIZES[-1]} 的 "
+              f"{len(outputs[TRANSFORM_CHUNK_SIZES[-1]])} 字节不同"
+              for chunk_size, output in outputs.items() if output != outputs[TRANSFORM_CHUNK_SIZES[-1]]]
+    output = outputs[TRANSFORM_CHUNK_SIZES[-1]]
+    pre = page[page.index('<PRE'):page.index('</PRE>')]
+    if pre not in output:
+        errors.append("<pre> 中的内容被修改")
+    if 'a</script>b' in output or output.lower().count('<script') != page.lower().count('<script'):
+        errors.append("数据中的 </script> 没有保持转义")
+    if '\n    <' in output.split('<PRE')[0]:
+        errors.append("<pre> 之前的缩进没有去掉")
+    return errors
+
+def run_checks(names, update_golden=False, keep=False):
+    os.environ['TZ'] = 'UTC'
+    if hasattr(time, 'tzset'):
+        time.tzset()
+
+    golden = {}
+    if os.path.exists(GOLDEN_FILE):
+        with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+            golden = json.load(f)
+
+    failures = []
+    work_dir = tempfile.mkdtemp(prefix='regression-')
+    try:
+        errors = check_person_counts()
+        print(f"{'❌' if errors else '✅'} extract_person_count: {len(PERSON_COUNT_CASES)} 个用例")
+        failures += errors
+
+        errors = check_updated_today(work_dir)
+        print(f"{'❌' if errors else '✅'} 今天更新的时间判断")
+        failures += errors
+
+        errors, seconds = check_dataset_stats()
+        if errors is None:
+            print("⚠️  跳过数据集统计检查 (未安装 NumPy)")
+        else:
+            print(f"{'❌' if errors else '✅'} 数据集统计: {STATS_CLIPS} 个片段, {seconds:.2f} 秒")
+            failures += errors
+
+        errors = check_transform_chunking(work_dir)
+        print(f"{'❌' if errors else '✅'} transform_results: {len(TRANSFORM_CHUNK_SIZES)} 种分块大小的输出相同")
+        failures += errors
+
+        for name in names:
+            size, legacy_format = FIXTURES[name]
+            fixture_dir = os.path.join(work_dir, name)
+            os.makedirs(fixture_dir)
+            expected_times, recorded = make_fixture(fixture_dir, size, legacy_format)
+
+            errors = check_parse_existing_index(fixture_dir, recorded)
+            print(f"{'❌' if errors else '✅'} {name}: parse_existing_index 找回 {len(recorded)} 个记录时间")
+            failures += [f"{name}: {e}" for e in errors[:10]]
+
+            pages = {}
+            for kind in BUILDS:
+                ceiling_seconds, ceiling_mb = CEILINGS[name.split('-')[0]][kind]
+                stats = run_build(kind, fixture_dir)
+                with open(os.path.join(fixture_dir, 'index.html'), 'r', encoding='utf-8') as f:
+                    pages[kind] = normalize_page(f.read())
+                errors, groups = check_page(pages[kind], expected_times)
+                if stats['seconds'] > ceiling_seconds:
+                    errors.append(f"耗时 {stats['seconds']:.2f} 秒超出上限 {ceiling_seconds} 秒")
+                if stats['peak_mb'] is not None and stats['peak_mb'] > ceiling_mb:
+                    errors.append(f"峰值内存 {stats['peak_mb']:.1f} MB 超出上限 {ceiling_mb} MB")
+                peak = f"{stats['peak_mb']:.1f} MB" if stats['peak_mb'] is not None else "? MB"
+                print(f"{'❌' if errors else '✅'} {name} [{kind}]: {size} 个实验, {stats['seconds']:.2f} 秒, {peak}")
+                failures += [f"{name} [{kind}]: {e}" for e in errors[:10]]
+
+            if pages['lowmem'] != pages['index']:
+                failures.append(f"{name}: 低内存构建的页面与 create_visualization_index 不同")
+
+            digest = hashlib.sha256(pages['index'].encode('utf-8')).hexdigest()
+            current = {'page_sha256': digest, 'groups': dict(sorted(groups.items()))}
+            if update_golden:
+                golden[name] = current
+            elif name not in golden:
+                failures.append(f"{name}: 没有基准输出，使用 --update-golden 生成")
+            elif golden[name] != current:
+                failures.append(f"{name}: 页面与基准输出不同 (基准 {golden[name]}, 当前 {current})")
+    finally:
+        if keep:
+            print(f"📁 保留测试目录: {work_dir}")
+        else:
+            shutil.rmtree(work_dir)
+
+    if update_golden:
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(golden, f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write('\n')
+        print(f"📝 已更新基准输出: {GOLDEN_FILE}")
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print(f"\n{'❌ 回归检查失败' if failures else '✅ 回归检查通过'} ({len(failures)} 个问题)")
+    return not failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="索引构建的回归检查：分组、时间保留、基准页面、耗时和内存上限")
+    parser.add_argument('fixtures', nargs='*', metavar='FIXTURE', help=f"只运行指定的测试数据 (默认全部: {', '.join(FIXTURES)})")
+    parser.add_argument('--update-golden', action='store_true', help="用当前输出更新 regression_golden.json")
+    parser.add_argument('--keep', action='store_true', help="保留生成的测试目录")
+    parser.add_argument('--run-build', nargs=2, metavar=('KIND', 'DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_build:
+        _child_build(*args.run_build)
+        return
+    unknown = [name for name in args.fixtures if name not in FIXTURES]
+    if unknown:
+        parser.error(f"未知的测试数据: {', '.join(unknown)}")
+    if not run_checks(args.fixtures or list(FIXTURES), args.update_golden, args.keep):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,217 @@
+import os
+import json
+import html
+import fnmatch
+import zipfile
+import argparse
+from datetime import datetime, timedelta
+from collections import defaultdict
+
+from optimize_plots import OPTIMIZED_DIR, atomic_write_text
+from pack_results import PACK_DIR, read_entry, remove_entries
+from sidecars import SIDECAR_SUFFIX, experiment_sidecar_path
+from update_html import collect_experiments, parse_clip_name, parse_existing_index
+
+POLICY_FILE = 'retention.json'
+# 归档目录的位置是固定的：索引页面和预览服务器都按 archive/ 访问归档
+ARCHIVE_DIR = 'archive'
+ARCHIVE_INDEX_JSON = 'index.json'
+ARCHIVE_INDEX_HTML = 'index.html'
+
+# 规则之间是"或"的关系：满足任意一条保留规则的实验留在 results/ 中
+DEFAULT_POLICY = {
+    'keep_latest_per_video': None,  # 每个视频ID保留最新的 N 个片段
+    'keep_days': None,              # 保留最近 N 天内添加/更新的实验
+    'pinned': [],                   # 永久保留的实验名（支持通配符）
+}
+
+def load_policy(path=POLICY_FILE):
+    """读取保留策略配置；文件不存在时返回 None（不归档任何内容）"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        policy = dict(DEFAULT_POLICY, **json.load(f))
+    unknown = set(policy) - set(DEFAULT_POLICY)
+    if unknown:
+        raise ValueError(f"未知的保留策略字段: {', '.join(sorted(unknown))}")
+    return policy
+
+def attach_times(experiments, index_file="index.html"):
+    """为实验附加时间：优先使用索引中记录的时间，否则使用文件修改时间（打包的实验使用打包时记录的时间）"""
+    existing_times = parse_existing_index(index_file)
+    for exp in experiments:
+        if exp['name'] in existing_times:
+            exp['datetime'] = existing_times[exp['name']]
+        else:
+            mtime = exp['mtime'] if 'mtime' in exp else os.path.getmtime(exp['file'])
+            exp['datetime'] = datetime.fromtimestamp(mtime)
+    return experiments
+
+def plan_retention(experiments, policy, now=None):
+    """按策略把实验分为 (保留, 归档) 两部分；没有配置任何规则时全部保留"""
+    keep_latest = policy.get('keep_latest_per_video')
+    keep_days = policy.get('keep_days')
+    pinned = policy.get('pinned') or []
+    if keep_latest is None and keep_days is None:
+        return list(experiments), []
+
+    now = now or datetime.now()
+    kept_names = set()
+
+    if keep_days is not None:
+        cutoff = now - timedelta(days=keep_days)
+        kept_names.update(exp['name'] for exp in experiments if exp['datetime'] >= cutoff)
+
+    if keep_latest is not None:
+        # 无法解析视频ID的实验各自成组，因此总是会被保留
+        by_video = defaultdict(list)
+        for exp in experiments:
+            record = parse_clip_name(exp['name'])
+            by_video[record['video_id'] if record else exp['name']].append(exp)
+        for group in by_video.values():
+            group.sort(key=lambda x: x['datetime'], reverse=True)
+            kept_names.update(exp['name'] for exp in group[:keep_latest])
+
+    kept_names.update(
+        exp['name'] for exp in experiments
+        if any(fnmatch.fnmatchcase(exp['name'], pattern) for pattern in pinned)
+    )
+
+    keep = [exp for exp in experiments if exp['name'] in kept_names]
+    archive = [exp for exp in experiments if exp['name'] not in kept_names]
+    return keep, archive
+
+def load_archive_index(archive_dir=ARCHIVE_DIR):
+    path = os.path.join(archive_dir, ARCHIVE_INDEX_JSON)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def render_archive_html(archive_index):
+    """生成归档索引页面：按月份列出归档的实验及其所在的压缩包"""
+    by_bundle = defaultdict(list)
+    for name, entry in archive_index.items():
+        by_bundle[entry['bundle']].append((entry['added'], name))
+
+    sections = []
+    for bundle in sorted(by_bundle, reverse=True):
+        rows = "".join(
+            f"<tr><td>{html.escape(name)}</td><td>{html.escape(added)}</td></tr>"
+            for added, name in sorted(by_bundle[bundle], reverse=True)
+        )
+        sections.append(
+            f'<h2>{html.escape(bundle)} ({len(by_bundle[bundle])} experiments) '
+            f'<a href="{html.escape(bundle)}">⬇️ download</a></h2>\n'
+            f'<table><thead><tr><th>Experiment</th><th>Added</th></tr></thead><tbody>{rows}</tbody></table>\n'
+        )
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>Group Dance 3D Plot - Archived Experiments</title>
+    <meta charset="UTF-8">
+    <style>
+        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 20px; color: #2c3e50; }}
+        table {{ border-collapse: collapse; margin-bottom: 20px; }}
+        th, td {{ border: 1px solid #e0e0e0; padding: 6px 12px; text-align: left; }}
+        th {{ background: #ecf0f1; }}
+    </style>
+</head>
+<body>
+    <h1>Archived Experiments</h1>
+    <p><a href="../index.html">← Back to index</a> &nbsp; {len(archive_index)} archived experiments</p>
+{''.join(sections)}</body>
+</html>
+"""
+
+def archive_experiments(experiments, archive_dir=ARCHIVE_DIR, pack_dir=PACK_DIR, root='results'):
+    """把实验（连同元数据文件）移动到按月份划分的 zip 压缩包中，并更新归档索引
+
+    打包的实验从分片中读取内容；归档后从分片索引中删除，否则原文件删除后又会作为打包实验出现在索引中。
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    archive_index = load_archive_index(archive_dir)
+
+    by_month = defaultdict(list)
+    for exp in experiments:
+        by_month[exp['datetime'].strftime('%Y-%m')].append(exp)
+
+    for month, month_experiments in sorted(by_month.items()):
+        bundle = f"{month}.zip"
+        bundle_path = os.path.join(archive_dir, bundle)
+        arcnames = {}
+        with zipfile.ZipFile(bundle_path, 'a', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+            existing = set(zf.namelist())
+            for exp in month_experiments:
+                arcname = os.path.basename(exp['file'])
+                # 同名实验重新生成后再次归档时，用时间戳区分，不覆盖旧版本
+                if arcname in existing:
+                    arcname = f"{exp['name']}_{exp['datetime'].strftime('%Y%m%d%H%M%S')}.html"
+                if 'pack_shard' in exp:
+                    info = zipfile.ZipInfo(arcname, date_time=datetime.fromtimestamp(exp['mtime']).timetuple()[:6])
+                    zf.writestr(info, read_entry(exp['name'], pack_dir),
+                                compress_type=zipfile.ZIP_DEFLATED, compresslevel=9)
+                else:
+                    zf.write(exp['file'], arcname)
+                arcnames[exp['name']] = arcname
+                meta_file = experiment_sidecar_path(exp, root)
+                if os.path.exists(meta_file):
+                    zf.write(meta_file, os.path.splitext(arcname)[0] + SIDECAR_SUFFIX)
+        for exp in month_experiments:
+            archive_index[exp['name']] = {
+                'bundle': bundle,
+                'file': arcnames[exp['name']],
+                'added': exp['datetime'].strftime('%a %b %d %H:%M:%S %Y'),
+            }
+            # 写入压缩包后再删除原文件、元数据文件、预压缩文件及其优化版本
+            if 'pack_shard' not in exp:
+                os.remove(exp['file'])
+            optimized_file = os.path.join(OPTIMIZED_DIR, os.path.basename(exp['file']))
+            for derived in (experiment_sidecar_path(exp, root), exp['file'] + '.gz', exp['file'] + '.br', optimized_file):
+                if os.path.exists(derived):
+                    os.remove(derived)
+        print(f"  🗄️  {bundle}: 归档 {len(month_experiments)} 个实验")
+
+    removed_count = remove_entries([exp['name'] for exp in experiments], pack_dir)
+    if removed_count:
+        print(f"  📦 从分片索引中删除 {removed_count} 个已归档的实验")
+
+    atomic_write_text(os.path.join(archive_dir, ARCHIVE_INDEX_JSON),
+                      json.dumps(archive_index, indent=2, ensure_ascii=False, sort_keys=True))
+    atomic_write_text(os.path.join(archive_dir, ARCHIVE_INDEX_HTML), render_archive_html(archive_index))
+    return archive_index
+
+def apply_retention(root='results', policy_file=POLICY_FILE, index_file="index.html", dry_run=False):
+    """按保留策略归档旧的实验，返回被归档的实验列表"""
+    policy = load_policy(policy_file)
+    if policy is None:
+        return []
+
+    experiments = collect_experiments(root)
+    if not experiments:
+        return []
+
+    keep, archive = plan_retention(attach_times(experiments, index_file), policy)
+    print(f"📦 保留策略: 保留 {len(keep)} 个实验，归档 {len(archive)} 个实验")
+    if archive and not dry_run:
+        archive_experiments(archive, root=root)
+    elif dry_run:
+        for exp in archive:
+            print(f"  🗄️  (dry run) {exp['name']} ({exp['datetime'].strftime('%Y-%m-%d')})")
+    return archive
+
+def main():
+    parser = argparse.ArgumentParser(description="按保留策略把旧的可视化结果归档到按月的压缩包中")
+    parser.add_argument('--root', default='results', help="结果目录")
+    parser.add_argument('--policy', default=POLICY_FILE, help="保留策略配置文件 (JSON)")
+    parser.add_argument('--dry-run', action='store_true', help="只显示将被归档的实验")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.policy):
+        print(f"❌ 保留策略文件 '{args.policy}' 不存在")
+        return
+    apply_retention(args.root, args.policy, dry_run=args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+import os
+import re
+import sys
+import gzip
+import time
+import hashlib
+import argparse
+import posixpath
+import threading
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from optimize_plots import OPTIMIZED_DIR
+from pack_results import PACK_DIR, load_pack_index, read_entry
+from retention import ARCHIVE_DIR
+
+# 带内容哈希的静态资源（index.<hash>.css/js），可以被浏览器永久缓存
+HASHED_ASSET_PATTERN = re.compile(r'(^|/)index\.[0-9a-f]{10}\.(css|js)$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# 预压缩的兄弟文件：Accept-Encoding 名称 -> 文件后缀（按优先级排列）
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE_SUFFIXES = ('.html', '.css', '.js', '.json')
+
+# 注入到索引页面的自动刷新脚本，通过 Server-Sent Events 监听索引文件的变化
+RELOAD_PATH = '/__reload'
+RELOAD_PAGES = ('index.html', 'stats.html')
+RELOAD_SNIPPET = (b'<script>new EventSource("' + RELOAD_PATH.encode('ascii') + b'")'
+                  b'.onmessage = function() { location.reload(); };</script>\n')
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# 合并索引（node_manifests --base-url）从其它来源读取本服务器上的分片时需要的 CORS 设置；
+# 带 Range 头的 fetch 会先发送 OPTIONS 预检请求
+CORS_ALLOW_METHODS = 'GET, HEAD, OPTIONS'
+CORS_ALLOW_HEADERS = 'Range, If-Range, If-None-Match'
+CORS_EXPOSE_HEADERS = 'Content-Range, Content-Length, Accept-Ranges, ETag'
+CORS_MAX_AGE = 86400
+
+# 站点根目录通常就是仓库本身，只提供索引相关的文件，不暴露 .git/ 和源代码
+PUBLIC_FILES = ('index.html', 'stats.html', 'stats.json', 'compare.html', 'compare.json')
+PUBLIC_DIRS = ('results', OPTIMIZED_DIR, PACK_DIR, ARCHIVE_DIR)
+
+def is_public(relpath):
+    """URL路径（相对站点根目录，已规范化）是否允许访问；任何一级以 . 开头的路径都不允许"""
+    parts = relpath.split('/') if relpath not in ('', '.') else ['index.html']
+    if any(part.startswith('.') for part in parts):
+        return False
+    if len(parts) == 1:
+        return parts[0] in PUBLIC_FILES or bool(HASHED_ASSET_PATTERN.search(parts[0]))
+    return parts[0] in PUBLIC_DIRS
+
+class _ETagCache:
+    """按路径缓存文件的内容哈希，避免每次请求都重新计算
+
+    每个路径只保留最新的 (大小, 修改时间, ETag)，文件变化后旧的记录被替换，缓存大小不超过文件数。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def get(self, path, st):
+        stamp = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        etag = f'"{h.hexdigest()[:32]}"'
+        with self._lock:
+            self._cache[path] = (stamp, etag)
+        return etag
+
+_etags = _ETagCache()
+
+class PreviewRequestHandler(SimpleHTTPRequestHandler):
+    """在 SimpleHTTPRequestHandler 的基础上增加强ETag、缓存头、预压缩文件和Range请求支持"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if urlsplit(self.path).path == RELOAD_PATH:
+            self._serve_reload_events()
+            return
+        self._serve(head_only=False)
+
+    def do_HEAD(self):
+        self._serve(head_only=True)
+
+    def do_OPTIONS(self):
+        """CORS 预检请求；没有配置 cors_origin 时与 SimpleHTTPRequestHandler 一样不支持"""
+        if not self.server.cors_origin:
+            self.send_error(HTTPStatus.NOT_IMPLEMENTED, "Unsupported method ('OPTIONS')")
+            return
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_header('Access-Control-Allow-Methods', CORS_ALLOW_METHODS)
+        self.send_header('Access-Control-Allow-Headers', CORS_ALLOW_HEADERS)
+        self.send_header('Access-Control-Max-Age', str(CORS_MAX_AGE))
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def end_headers(self):
+        # 所有响应（包括 206/304/404）都带上 CORS 头，跨源的页面才能读取分片和错误状态
+        if self.server.cors_origin:
+            self.send_header('Access-Control-Allow-Origin', self.server.cors_origin)
+            self.send_header('Access-Control-Expose-Headers', CORS_EXPOSE_HEADERS)
+        super().end_headers()
+
+    def _resolve(self):
+        """把URL映射为文件路径；目录映射到其中的 index.html"""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        return path
+
+    def _pick_encoding(self, path):
+        accepted = {
+            item.split(';')[0].strip().lower()
+            for item in self.headers.get('Accept-Encoding', '').split(',')
+        }
+        for encoding, suffix in PRECOMPRESSED:
+            # 只使用不旧于原始文件的预压缩文件
+            if (encoding in accepted and os.path.isfile(path + suffix)
+                    and os.path.getmtime(path + suffix) >= os.path.getmtime(path)):
+                return encoding, path + suffix
+        return None, path
+
+    def _packed_entry(self, relpath):
+        """packed/<name>.html 不是真实文件时，从分片中读取对应的页面，返回 (内容, ETag, 修改时间)"""
+        if not relpath.startswith(PACK_DIR + '/'):
+            return None
+        pack_index = load_pack_index(os.path.join(self.directory, PACK_DIR))
+        name = posixpath.basename(relpath).split('.')[0]
+        entry = pack_index['entries'].get(name)
+        if entry is None:
+            return None
+        data = read_entry(name, os.path.join(self.directory, PACK_DIR), pack_index)
+        return data, f'"{entry["sha256"][:32]}"', entry['source_mtime_ns'] / 1e9
+
+    def _serve(self, head_only):
+        relpath = posixpath.normpath(unquote(urlsplit(self.path).path)).lstrip('/')
+        if not is_public(relpath):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+        path = self._resolve()
+        packed = None if os.path.isfile(path) else self._packed_entry(relpath)
+        if not os.path.isfile(path) and packed is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        inject_reload = self.server.auto_reload and os.path.basename(path) in RELOAD_PAGES
+
+        # Range 请求直接读取原始文件（便于按偏移读取分片），否则优先使用预压缩文件
+        range_header = self.headers.get('Range')
+        encoding, served_path = (None, path) if (range_header or inject_reload or packed) else self._pick_encoding(path)
+
+        if packed:
+            body, etag, mtime = packed
+            size = len(body)
+        elif inject_reload:
+            mtime = os.path.getmtime(served_path)
+            with open(served_path, 'rb') as f:
+                body = f.read()
+            marker = body.rfind(b'</body>')
+            body = body[:marker] + RELOAD_SNIPPET + body[marker:] if marker >= 0 else body + RELOAD_SNIPPET
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            size = len(body)
+        else:
+            st = os.stat(served_path)
+            body = None
+            etag = _etags.get(served_path, st)
+            size = st.st_size
+            mtime = st.st_mtime
+        if encoding:
+            etag = etag[:-1] + f'-{encoding}"'
+
+        cache_control = IMMUTABLE_CACHE if HASHED_ASSET_PATTERN.search(relpath) else REVALIDATE_CACHE
+
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.end_headers()
+            return
+
+        # If-Range 不匹配时忽略 Range，返回完整内容
+        if range_header and self.headers.get('If-Range') not in (None, etag):
+            range_header = None
+
+        # 只支持单个范围；多个范围（bytes=0-1,3-4）或无法解析的 Range 忽略，返回完整内容
+        match = RANGE_PATTERN.match(range_header.strip()) if range_header else None
+        if match and not (match.group(1) or match.group(2)):
+            match = None
+
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        if match:
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                # bytes=-N 表示最后 N 个字节
+                start = max(size - int(match.group(2)), 0)
+            if start > end or start >= size:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = HTTPStatus.PARTIAL_CONTENT
+
+        length = end - start + 1
+        self.send_response(status)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(mtime, usegmt=True))
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+
+        if head_only:
+            return
+        if body is not None:
+            self.wfile.write(body[start:end + 1])
+            return
+        with open(served_path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(1 << 16, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def _serve_reload_events(self):
+        """Server-Sent Events：索引文件的修改时间变化时通知页面刷新"""
+        index_path = os.path.join(self.directory, 'index.html')
+
+        def mtime():
+            try:
+                return os.stat(index_path).st_mtime_ns
+            except OSError:
+                return None
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        last = mtime()
+        last_ping = time.monotonic()
+        try:
+            while True:
+                time.sleep(self.server.poll_interval_seconds)
+                current = mtime()
+                if current != last:
+                    self.wfile.write(b'data: reload\n\n')
+                    self.wfile.flush()
+                    return
+                # 定期发送注释行，及时发现已断开的连接
+                if time.monotonic() - last_ping >= 15:
+                    self.wfile.write(b': ping\n\n')
+                    self.wfile.flush()
+                    last_ping = time.monotonic()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def precompress(directory='.', min_bytes=1024):
+    """为索引页面、静态资源和结果页面生成 .gz（以及可用时的 .br）兄弟文件；已是最新的跳过
+
+    只处理预览服务器会提供的文件（is_public），不压缩站点根目录中的其它文件（例如回归检查的数据）。
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    relpaths = list(os.listdir(directory))
+    for public_dir in PUBLIC_DIRS:
+        if os.path.isdir(os.path.join(directory, public_dir)):
+            relpaths += [f"{public_dir}/{f}" for f in os.listdir(os.path.join(directory, public_dir))]
+
+    count = 0
+    for relpath in relpaths:
+        path = os.path.join(directory, relpath)
+        if not relpath.endswith(COMPRESSIBLE_SUFFIXES) or not is_public(relpath) or not os.path.isfile(path):
+            continue
+        st = os.stat(path)
+        if st.st_size < min_bytes:
+            continue
+        data = None
+        for suffix, compress in (('.gz', lambda d: gzip.compress(d, 9, mtime=0)),
+                                 ('.br', brotli.compress if brotli else None)):
+            target = path + suffix
+            if compress is None or (os.path.exists(target) and os.path.getmtime(target) >= st.st_mtime):
+                continue
+            if data is None:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            with open(target + '.tmp', 'wb') as f:
+                f.write(compress(data))
+            os.replace(target + '.tmp', target)
+            count += 1
+    print(f"🗜️  生成了 {count} 个预压缩文件" + ("" if brotli else " (未安装 brotli，只生成 .gz)"))
+
+def serve(directory='.', host='127.0.0.1', port=8000, auto_reload=True, poll_interval_seconds=0.5, cors_origin=None):
+    """启动本地预览服务器
+
+    cors_origin: 允许跨源读取的来源（例如合并索引所在的 "https://host" 或 "*"）；不指定时只允许同源访问
+    """
+    directory = os.path.abspath(directory)
+
+    def handler(*args, **kwargs):
+        return PreviewRequestHandler(*args, directory=directory, **kwargs)
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.auto_reload = auto_reload
+    server.poll_interval_seconds = poll_interval_seconds
+    server.cors_origin = cors_origin
+
+    print(f"🌐 预览服务器已启动: http://{host}:{port}/  (目录: {directory})")
+    if auto_reload:
+        print(f"🔄 index.html 重新生成后页面会自动刷新")
+    if cors_origin:
+        print(f"🔓 允许来自 {cors_origin} 的跨源请求")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 预览服务器已停止")
+    finally:
+        server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地预览 index.html 和 results/（支持ETag、缓存头、预压缩和Range请求）")
+    parser.add_argument('--directory', default='.', help="站点根目录")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址 (需要从其它机器访问时使用 0.0.0.0)")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--no-reload', action='store_true', help="不注入自动刷新脚本")
+    parser.add_argument('--precompress', action='store_true', help="启动前生成 .gz/.br 预压缩文件")
+    parser.add_argument('--cors-origin', default=None,
+                        help="允许跨源读取的来源，例如合并索引所在的地址或 * (node_manifests --base-url 指向本服务器时需要)")
+    args = parser.parse_args(argv)
+
+    if args.precompress:
+        precompress(args.directory)
+    serve(args.directory, args.host, args.port, auto_reload=not args.no_reload, cors_origin=args.cors_origin)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,89 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from optimize_plots import atomic_write_text
+
+# 生成任务在每个结果页面旁边写入的元数据文件: results/<name>.meta.json
+SIDECAR_SUFFIX = '.meta.json'
+SIDECAR_CACHE = '.sidecar_cache.json'
+
+# 索引中展示/过滤的字段
+SIDECAR_FIELDS = ('model', 'checkpoint', 'metrics', 'num_dancers', 'frame_count', 'source_clip')
+
+def sidecar_path(result_file):
+    """results/<name>.html -> results/<name>.meta.json"""
+    return os.path.splitext(result_file)[0] + SIDECAR_SUFFIX
+
+def experiment_sidecar_path(exp, root='results'):
+    """实验的元数据文件路径"""
+    # 打包的实验没有真实的页面文件，--remove-sources 只删除页面，元数据文件仍在 results/ 中
+    if 'pack_shard' in exp:
+        return os.path.join(root, exp['name'] + SIDECAR_SUFFIX)
+    return sidecar_path(exp['file'])
+
+def _read_sidecar(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠️  无法读取元数据 {path}: {e}")
+        return None
+    if not isinstance(data, dict):
+        print(f"  ⚠️  元数据格式错误 (应为JSON对象): {path}")
+        return None
+    return {key: data[key] for key in SIDECAR_FIELDS if key in data}
+
+def attach_sidecars(experiments, root='results', max_workers=16):
+    """为实验附加元数据 exp['meta']（没有元数据文件时为空字典）
+
+    按修改时间缓存到 results/.sidecar_cache.json，只有新增或修改过的元数据文件才会被读取，
+    并且用线程池并行读取。
+    """
+    cache_file = os.path.join(root, SIDECAR_CACHE)
+    cache = {}
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+    new_cache = {}
+    to_read = []
+    for exp in experiments:
+        exp['meta'] = {}
+        path = experiment_sidecar_path(exp, root)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        cached = cache.get(path)
+        if cached and cached['mtime_ns'] == mtime_ns:
+            exp['meta'] = cached['meta']
+            new_cache[path] = cached
+        else:
+            to_read.append((exp, path, mtime_ns))
+
+    if to_read:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for (exp, path, mtime_ns), meta in zip(to_read, pool.map(_read_sidecar, [p for _, p, _ in to_read])):
+                if meta is not None:
+                    exp['meta'] = meta
+                    new_cache[path] = {'mtime_ns': mtime_ns, 'meta': meta}
+
+    if new_cache != cache:
+        atomic_write_text(cache_file, json.dumps(new_cache, ensure_ascii=False))
+    print(f"🏷️  元数据: {len(new_cache)} 个实验有元数据文件，本次读取 {len(to_read)} 个")
+    return experiments
+
+def format_metrics(metrics, limit=4):
+    """把指标字典格式化为简短的文字，例如 "FID 12.35 · Div 8.1" """
+    if not isinstance(metrics, dict):
+        return ''
+    parts = []
+    for key, value in list(metrics.items())[:limit]:
+        if isinstance(value, float):
+            value = f"{value:.4g}"
+        parts.append(f"{key} {value}")
+    return ' · '.join(parts)
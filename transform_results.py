@@ -0,0 +1,277 @@
+import os
+import re
+import sys
+import json
+import argparse
+from datetime import datetime
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from optimize_plots import (atomic_write_text, atomic_writer, compact_dumps, find_plotly_calls, is_result_page,
+                            splice_replacements)
+
+# 原地重写 results/*.html：每个文件只读一遍，依次经过多个变换后写入临时文件再 rename
+TRANSFORM_MANIFEST = 'transforms.json'
+CHUNK_SIZE = 1 << 20
+
+# plotly.js 内联脚本开头的版权注释，例如 "* plotly.js v2.27.0"
+PLOTLY_BANNER_PATTERN = re.compile(r'\*\s*plotly\.js v(\d+\.\d+\.\d+)')
+PLOTLY_CDN_URL = 'https://cdn.plot.ly/plotly-{version}.min.js'
+
+SCRIPT_OPEN_PATTERN = re.compile(r'<script\b', re.IGNORECASE)
+SCRIPT_CLOSE_PATTERN = re.compile(r'</script\s*>', re.IGNORECASE)
+LINE_INDENT_PATTERN = re.compile(r'(\r?\n)[ \t]+')
+BLANK_LINES_PATTERN = re.compile(r'(\r?\n)(?:[ \t]*\r?\n)+')
+# 内容中的空白有意义的元素；strip_indent 遇到后停止处理
+PRESERVE_PATTERN = re.compile(r'<(?:pre|textarea)\b', re.IGNORECASE)
+PRESERVE_PREFIX = '<textarea'
+TRAILING_SPACE_PATTERN = re.compile(r'[\r\n][ \t\r\n]*$')
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    """分块读取文本（newline='' 保留原始换行符）"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            yield chunk
+
+def iter_events(chunks):
+    """把文本块切分为事件流:
+
+        ('text', 文本)                      <script> 之外的内容，按块输出
+        ('script', 开始标签, 内容, 结束标签)  完整的 <script> 元素（内容会被整体缓存）
+    """
+    buf = ''
+    open_tag = None  # 不为 None 时表示正在 <script> 元素内部
+    search_from = 0
+    keep = len('</script') + 1  # 块末尾可能是被截断的标签，留到下一块再判断
+    for chunk in chunks:
+        buf += chunk
+        while True:
+            if open_tag is None:
+                match = SCRIPT_OPEN_PATTERN.search(buf)
+                end = buf.find('>', match.end()) if match else -1
+                if end < 0:
+                    cut = match.start() if match else max(len(buf) - keep, 0)
+                    if cut:
+                        yield ('text', buf[:cut])
+                        buf = buf[cut:]
+                    break
+                if match.start():
+                    yield ('text', buf[:match.start()])
+                open_tag = buf[match.start():end + 1]
+                buf = buf[end + 1:]
+                search_from = 0
+            else:
+                match = SCRIPT_CLOSE_PATTERN.search(buf, search_from)
+                if not match:
+                    search_from = max(len(buf) - keep, 0)
+                    break
+                yield ('script', open_tag, buf[:match.start()], match.group(0))
+                open_tag = None
+                buf = buf[match.end():]
+    if open_tag is not None:
+        yield ('script', open_tag, buf, '')
+    elif buf:
+        yield ('text', buf)
+
+def render_event(event):
+    return event[1] if event[0] == 'text' else event[1] + event[2] + event[3]
+
+def dedup_bundle(events, options):
+    """把每个页面内联的 plotly.js（约 3.5 MB）替换为同一版本的共享脚本地址"""
+    url_template = options.get('bundle_url') or PLOTLY_CDN_URL
+    for event in events:
+        if event[0] == 'script' and 'src=' not in event[1].lower():
+            match = PLOTLY_BANNER_PATTERN.search(event[2], 0, 2000)
+            if match:
+                url = url_template.format(version=match.group(1))
+                yield ('script', f'<script src="{url}" charset="utf-8">', '', '</script>')
+                continue
+        yield event
+
+def compact_json(events, options):
+    """把 Plotly.newPlot / addFrames 的 JSON 参数重新序列化为紧凑格式（数值不变）"""
+    for event in events:
+        # 内联的 plotly.js 本身也包含 "Plotly.newPlot(" 字样，不能当作数据处理
+        if (event[0] == 'script' and ('Plotly.newPlot(' in event[2] or 'Plotly.addFrames(' in event[2])
+                and not PLOTLY_BANNER_PATTERN.search(event[2], 0, 2000)):
+            body = event[2]
+            replacements = [(start, end, compact_dumps(value))
+                            for _, args in find_plotly_calls(body) for start, end, value in args]
+            event = ('script', event[1], splice_replacements(body, replacements), event[3])
+        yield event
+
+def _strip_text(text, at_line_start):
+    if at_line_start:
+        text = text.lstrip(' \t')
+    return BLANK_LINES_PATTERN.sub(r'\1', LINE_INDENT_PATTERN.sub(r'\1', text))
+
+def _safe_cut(text):
+    """文本中可以安全处理到的位置：末尾的换行/空白和可能被截断的标签要等下一个事件"""
+    cut = len(text)
+    tail = TRAILING_SPACE_PATTERN.search(text)
+    if tail:
+        cut = tail.start()
+    lt = text.rfind('<', max(cut - len(PRESERVE_PREFIX), 0), cut)
+    return lt if lt >= 0 else cut
+
+def strip_indent(events, options):
+    """去掉 <script> 之外每行的缩进和空行；页面中有 <pre>/<textarea> 时从该处起不再处理
+
+    文本事件在任意位置被切分，末尾的换行/空白和可能被截断的标签留到下一个事件一起处理，
+    输出与分块大小无关。
+    """
+    at_line_start = True
+    enabled = True
+    pending = ''
+    for event in chain(events, [None]):  # None 表示文件结尾
+        if not enabled:
+            if event is not None:
+                yield event
+            continue
+        if event is not None and event[0] == 'text':
+            text = pending + event[1]
+            cut = _safe_cut(text)
+        else:
+            # <script> 元素或文件结尾：缓存的文本不会再有后续，全部处理
+            text = pending
+            cut = len(text)
+        match = PRESERVE_PATTERN.search(text, 0, cut)
+        if match:
+            enabled = False
+            out = _strip_text(text[:match.start()], at_line_start) + text[match.start():]
+            pending = ''
+        else:
+            out = _strip_text(text[:cut], at_line_start)
+            pending = text[cut:]
+        if out:
+            at_line_start = out.endswith('\n')
+            yield ('text', out)
+        if event is not None and event[0] != 'text':
+            at_line_start = False
+            yield event
+
+# 可用的变换（按此顺序执行）；每个变换接收事件流和选项，返回新的事件流
+TRANSFORMS = {
+    'dedup_bundle': dedup_bundle,
+    'compact_json': compact_json,
+    'strip_indent': strip_indent,
+}
+
+def transform_file(path, transform_names, options=None):
+    """单次读取、依次经过各个变换并原地替换文件；保留修改时间（索引用它判断实验是否更新）"""
+    options = options or {}
+    st = os.stat(path)
+    events = iter_events(read_chunks(path))
+    for name in transform_names:
+        events = TRANSFORMS[name](events, options)
+    with atomic_writer(path, buffering=CHUNK_SIZE) as f:
+        for event in events:
+            f.write(render_event(event))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    # 修改时间不变，旧的预压缩文件不会被判定为过期，需要直接删除
+    for derived in (path + '.gz', path + '.br'):
+        if os.path.exists(derived):
+            os.remove(derived)
+    new_st = os.stat(path)
+    return {'original_bytes': st.st_size, 'size': new_st.st_size, 'mtime_ns': new_st.st_mtime_ns}
+
+def load_transform_manifest(root='results'):
+    path = os.path.join(root, TRANSFORM_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  无法读取变换清单 {path}: {e}")
+        return {}
+
+def transform_results(root='results', transform_names=tuple(TRANSFORMS), options=None, workers=None, force=False):
+    """对 results/ 中的页面执行尚未应用过的变换，返回清单 {文件名: 已应用的变换...}
+
+    清单记录每个文件已应用的变换以及处理后的大小和修改时间；文件被重新生成（大小或修改时间变化）后
+    视为未处理。只有还缺少某些变换的文件才会被读取。
+    """
+    if not os.path.exists(root):
+        print(f"❌ 目录 '{root}' 不存在")
+        return {}
+    transform_names = [name for name in TRANSFORMS if name in transform_names]
+    manifest = load_transform_manifest(root)
+
+    jobs = {}
+    skipped_count = 0
+    for file in sorted(os.listdir(root)):
+        if not is_result_page(file):
+            continue
+        st = os.stat(os.path.join(root, file))
+        entry = manifest.get(file)
+        applied = []
+        if entry and not force and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            applied = entry['transforms']
+        pending = [name for name in transform_names if name not in applied]
+        if not pending:
+            skipped_count += 1
+            continue
+        jobs[file] = (applied, pending, entry if applied else None)
+
+    print(f"🔧 变换结果页面: {len(jobs)} 个待处理，{skipped_count} 个已处理 (变换: {', '.join(transform_names)})")
+
+    failed_count = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(transform_file, os.path.join(root, file), pending, options): file
+                       for file, (_, pending, _) in jobs.items()}
+            for future in as_completed(futures):
+                file = futures[future]
+                applied, pending, entry = jobs[file]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  ❌ {file}: {e}")
+                    failed_count += 1
+                    continue
+                manifest[file] = {
+                    'transforms': applied + pending,
+                    'original_bytes': entry['original_bytes'] if entry else result['original_bytes'],
+                    'size': result['size'],
+                    'mtime_ns': result['mtime_ns'],
+                    'transformed_at': datetime.now().isoformat(timespec='seconds'),
+                }
+                print(f"  ✅ {file}: {result['original_bytes'] / 1024:.1f} KB -> {result['size'] / 1024:.1f} KB "
+                      f"({', '.join(pending)})")
+
+    # 删除源文件已不存在的清单条目
+    for file in list(manifest):
+        if not os.path.exists(os.path.join(root, file)):
+            del manifest[file]
+    atomic_write_text(os.path.join(root, TRANSFORM_MANIFEST),
+                      json.dumps(manifest, indent=2, ensure_ascii=False, sort_keys=True))
+
+    total_original = sum(e['original_bytes'] for e in manifest.values())
+    total_size = sum(e['size'] for e in manifest.values())
+    print(f"📊 处理: {len(jobs) - failed_count}，跳过: {skipped_count}，失败: {failed_count}")
+    if total_size:
+        print(f"📉 总大小: {total_original / 1024 / 1024:.2f} MB -> {total_size / 1024 / 1024:.2f} MB "
+              f"(x{total_original / total_size:.2f})")
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="单次流式读取 results/ 中的页面，依次执行多个变换并原地替换")
+    parser.add_argument('--root', default='results', help="结果目录")
+    parser.add_argument('--transforms', default=','.join(TRANSFORMS),
+                        help=f"逗号分隔的变换列表 (可选: {', '.join(TRANSFORMS)})")
+    parser.add_argument('--bundle-url', default=PLOTLY_CDN_URL,
+                        help="dedup_bundle 使用的 plotly.js 地址，{version} 替换为页面中内联的版本号")
+    parser.add_argument('--workers', type=int, default=None, help="进程数 (默认使用CPU核数)")
+    parser.add_argument('--force', action='store_true', help="忽略清单，对所有页面重新执行变换")
+    args = parser.parse_args(argv)
+
+    transform_names = [name.strip() for name in args.transforms.split(',') if name.strip()]
+    unknown = [name for name in transform_names if name not in TRANSFORMS]
+    if unknown:
+        parser.error(f"未知的变换: {', '.join(unknown)}")
+    transform_results(args.root, transform_names, {'bundle_url': args.bundle_url}, args.workers, args.force)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
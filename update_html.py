@@ -1,20 +1,734 @@
-import os, time
+import os, sys, time
 import subprocess
+import hashlib
+import glob
+import json
 from datetime import datetime
 from collections import defaultdict
+from html.parser import HTMLParser
 import re
+import html
+
+from optimize_plots import OPTIMIZED_DIR, is_result_page
+from dedup_results import load_duplicates
+from pack_results import packed_experiments
+from sidecars import attach_sidecars, format_metrics
+
+# 索引页面的静态部分（CSS/JS），作为带内容哈希的外部文件输出一次，便于浏览器跨版本缓存
+INDEX_CSS = """\
+body { 
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; 
+    margin: 20px; 
+    background-color: #f5f5f5;
+    line-height: 1.6;
+}
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+    background: white;
+    padding: 30px;
+    border-radius: 10px;
+    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+}
+h1 { 
+    color: #2c3e50; 
+    text-align: center;
+    margin-bottom: 10px;
+    font-size: 2.5em;
+}
+.subtitle {
+    text-align: center;
+    color: #7f8c8d;
+    font-size: 1.2em;
+    margin-bottom: 30px;
+}
+.person-toggle {
+    margin: 15px 0;
+    border: 1px solid #e0e0e0;
+    border-radius: 8px;
+    overflow: hidden;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+}
+.person-header {
+    background: linear-gradient(135deg, #74b9ff 0%, #0984e3 100%);
+    color: white;
+    padding: 15px 20px;
+    cursor: pointer;
+    font-weight: 600;
+    font-size: 1.1em;
+    transition: all 0.3s ease;
+    user-select: none;
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+}
+.person-header:hover {
+    background: linear-gradient(135deg, #0984e3 0%, #74b9ff 100%);
+}
+.person-header.unknown {
+    background: linear-gradient(135deg, #a29bfe 0%, #6c5ce7 100%);
+}
+.person-header.unknown:hover {
+    background: linear-gradient(135deg, #6c5ce7 0%, #a29bfe 100%);
+}
+.toggle-icon {
+    transition: transform 0.3s ease;
+    font-size: 1.2em;
+}
+.person-content {
+    display: none;
+    background: #fafafa;
+    border-top: 1px solid #e0e0e0;
+}
+.person-content.active {
+    display: block;
+}
+.exp-item { 
+    margin: 0;
+    padding: 15px 20px; 
+    border-bottom: 1px solid #eeeeee;
+    background: white;
+    transition: background-color 0.2s ease;
+}
+.exp-item:last-child {
+    border-bottom: none;
+}
+.exp-item:hover {
+    background-color: #f8f9ff;
+}
+.exp-name { 
+    font-weight: 600;
+    color: #2c3e50;
+    margin-bottom: 8px;
+    font-size: 1.05em;
+}
+.exp-meta {
+    color: #636e72;
+    font-size: 0.85em;
+    margin: -4px 0 8px;
+}
+.exp-item.filtered-out {
+    display: none;
+}
+.exp-filter {
+    width: 100%;
+    box-sizing: border-box;
+    padding: 10px 14px;
+    margin-bottom: 15px;
+    border: 1px solid #e0e0e0;
+    border-radius: 8px;
+    font-size: 1em;
+}
+.exp-details {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    flex-wrap: wrap;
+    gap: 10px;
+}
+.exp-time {
+    color: #7f8c8d;
+    font-size: 0.9em;
+}
+.exp-link {
+    display: inline-block;
+    padding: 8px 16px;
+    background: linear-gradient(135deg, #00b894 0%, #00a085 100%);
+    color: white;
+    text-decoration: none;
+    border-radius: 5px;
+    font-size: 0.9em;
+    transition: all 0.3s ease;
+    font-weight: 500;
+}
+.exp-link:hover {
+    background: linear-gradient(135deg, #00a085 0%, #00b894 100%);
+    transform: translateY(-1px);
+    box-shadow: 0 4px 8px rgba(0, 184, 148, 0.3);
+}
+.stats {
+    background: #ecf0f1;
+    padding: 15px;
+    border-radius: 8px;
+    margin-bottom: 20px;
+    text-align: center;
+    color: #2c3e50;
+}
+.stats a {
+    color: #0984e3;
+    text-decoration: none;
+}
+.stats strong {
+    color: #e74c3c;
+    font-size: 1.2em;
+}
+.person-icon {
+    margin-right: 8px;
+    font-size: 1.1em;
+}
+.exp-preview {
+    padding: 8px 16px;
+    background: white;
+    color: #0984e3;
+    border: 1px solid #74b9ff;
+    border-radius: 5px;
+    font-size: 0.9em;
+    cursor: pointer;
+    font-weight: 500;
+}
+.exp-preview:hover {
+    background: #f0f7ff;
+}
+.exp-item.previewing {
+    background-color: #eaf4ff;
+}
+.exp-item.new-since-visit .exp-name::after {
+    content: "new";
+    margin-left: 8px;
+    padding: 1px 6px;
+    border-radius: 4px;
+    background: #00b894;
+    color: white;
+    font-size: 0.75em;
+    vertical-align: middle;
+}
+.preview-pane {
+    display: none;
+    position: sticky;
+    top: 0;
+    z-index: 10;
+    margin-bottom: 20px;
+    border: 1px solid #e0e0e0;
+    border-radius: 8px;
+    overflow: hidden;
+    background: white;
+    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+}
+.preview-pane.active {
+    display: block;
+}
+.preview-bar {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    padding: 8px 15px;
+    background: #2c3e50;
+    color: white;
+    font-size: 0.9em;
+}
+.preview-bar button {
+    background: none;
+    border: none;
+    color: white;
+    font-size: 1.1em;
+    cursor: pointer;
+}
+.preview-frame {
+    display: block;
+    width: 100%;
+    height: 60vh;
+    border: none;
+}
+@media (max-width: 768px) {
+    .container { margin: 10px; padding: 15px; }
+    h1 { font-size: 2em; }
+    .exp-details { flex-direction: column; align-items: flex-start; }
+    .person-header { padding: 12px 15px; }
+    .exp-item { padding: 12px 15px; }
+    .preview-frame { height: 45vh; }
+}
+"""
+
+INDEX_JS = """\
+function togglePerson(header) {
+    const content = header.nextElementSibling;
+    const icon = header.querySelector('.toggle-icon');
+
+    if (content.classList.contains('active')) {
+        content.classList.remove('active');
+        icon.style.transform = 'rotate(0deg)';
+    } else {
+        content.classList.add('active');
+        icon.style.transform = 'rotate(90deg)';
+    }
+}
+
+// Add keyboard support
+document.addEventListener('keydown', function(e) {
+    if (e.target.tagName === 'INPUT') return;
+    if (e.key === 'Escape') {
+        closePreview();
+        // Close all toggles
+        document.querySelectorAll('.person-content.active').forEach(content => {
+            content.classList.remove('active');
+            const icon = content.previousElementSibling.querySelector('.toggle-icon');
+            icon.style.transform = 'rotate(0deg)';
+        });
+    }
+
+    // Step through the expanded experiments in the preview pane
+    if (currentItem && (e.key === 'ArrowDown' || e.key === 'j')) {
+        e.preventDefault();
+        stepPreview(1);
+    }
+    if (currentItem && (e.key === 'ArrowUp' || e.key === 'k')) {
+        e.preventDefault();
+        stepPreview(-1);
+    }
+
+    // Press 'a' to expand all sections
+    if (e.key === 'a' || e.key === 'A') {
+        document.querySelectorAll('.person-content').forEach(content => {
+            content.classList.add('active');
+            const icon = content.previousElementSibling.querySelector('.toggle-icon');
+            icon.style.transform = 'rotate(90deg)';
+        });
+    }
+});
+
+// Inline preview: a single reused iframe, so at most one plot is loaded at a time
+let currentItem = null;
+let previewHidden = false;
+let blobURL = null;
+const prefetched = new Set();
+
+// Packed entries live inside a shard file and are read with a byte-range request
+function plotURL(item) {
+    if (!item.dataset.shard) return Promise.resolve(item.dataset.file);
+    const start = Number(item.dataset.offset);
+    const end = start + Number(item.dataset.length) - 1;
+    return fetch(item.dataset.shard, {headers: {Range: `bytes=${start}-${end}`}})
+        .then(response => response.blob().then(blob => response.status === 206 ? blob : blob.slice(start, end + 1)))
+        .then(blob => URL.createObjectURL(new Blob([blob], {type: 'text/html'})));
+}
+
+function loadFrame(frame, item) {
+    plotURL(item).then(url => {
+        if (item !== currentItem) {
+            if (url.startsWith('blob:')) URL.revokeObjectURL(url);
+            return;
+        }
+        unloadFrame(frame);
+        blobURL = url.startsWith('blob:') ? url : null;
+        frame.src = url;
+    });
+}
+
+function unloadFrame(frame) {
+    frame.src = 'about:blank';
+    if (blobURL) URL.revokeObjectURL(blobURL);
+    blobURL = null;
+}
+
+function prefetch(item) {
+    // Prefetching a shard would download all of it, so packed entries are fetched on demand
+    const href = item.dataset.file;
+    if (item.dataset.shard || !href || prefetched.has(href)) return;
+    prefetched.add(href);
+    const link = document.createElement('link');
+    link.rel = 'prefetch';
+    link.href = href;
+    document.head.appendChild(link);
+}
+
+function visibleItems() {
+    return Array.from(document.querySelectorAll('.person-content.active .exp-item:not(.filtered-out)'));
+}
+
+// Filter rows by name and sidecar metadata; groups with matches are expanded
+function applyFilter(query) {
+    query = query.trim().toLowerCase();
+    document.querySelectorAll('.person-content').forEach(content => {
+        let matches = 0;
+        content.querySelectorAll('.exp-item').forEach(item => {
+            const text = (item.querySelector('.exp-name').textContent + ' ' + item.dataset.meta).toLowerCase();
+            const hit = !query || text.includes(query);
+            item.classList.toggle('filtered-out', !hit);
+            if (hit) matches++;
+        });
+        if (query) {
+            content.classList.toggle('active', matches > 0);
+            content.previousElementSibling.querySelector('.toggle-icon').style.transform =
+                matches > 0 ? 'rotate(90deg)' : 'rotate(0deg)';
+        }
+    });
+}
+
+function showPreview(item) {
+    const pane = document.getElementById('preview-pane');
+    const frame = pane.querySelector('.preview-frame');
+    if (currentItem) currentItem.classList.remove('previewing');
+    currentItem = item;
+    item.classList.add('previewing');
+    pane.querySelector('.preview-title').textContent = item.querySelector('.exp-name').textContent;
+    pane.classList.add('active');
+    loadFrame(frame, item);
+    previewHidden = false;
+    item.scrollIntoView({block: 'nearest'});
+
+    // Warm the cache for the next clip
+    const items = visibleItems();
+    const next = items[items.indexOf(item) + 1];
+    if (next) prefetch(next);
+}
+
+function stepPreview(offset) {
+    const items = visibleItems();
+    const next = items[items.indexOf(currentItem) + offset];
+    if (next) showPreview(next);
+}
+
+function closePreview() {
+    const pane = document.getElementById('preview-pane');
+    if (!pane || !currentItem) return;
+    unloadFrame(pane.querySelector('.preview-frame'));
+    pane.classList.remove('active');
+    currentItem.classList.remove('previewing');
+    currentItem = null;
+}
+
+// Unload the plot while the pane is off-screen or the tab is hidden, reload when it comes back
+function setPreviewLoaded(loaded) {
+    if (!currentItem) return;
+    const frame = document.querySelector('#preview-pane .preview-frame');
+    if (!loaded && !previewHidden) {
+        unloadFrame(frame);
+        previewHidden = true;
+    } else if (loaded && previewHidden) {
+        loadFrame(frame, currentItem);
+        previewHidden = false;
+    }
+}
+
+document.addEventListener('visibilitychange', function() {
+    setPreviewLoaded(!document.hidden);
+});
+
+document.addEventListener('DOMContentLoaded', function() {
+    const filter = document.getElementById('exp-filter');
+    if (filter) filter.addEventListener('input', () => applyFilter(filter.value));
+    document.querySelectorAll('.exp-item').forEach(item => {
+        item.addEventListener('mouseenter', () => prefetch(item), {once: true});
+    });
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver(entries => {
+            entries.forEach(entry => setPreviewLoaded(entry.isIntersecting));
+        });
+        observer.observe(document.getElementById('preview-pane'));
+    }
+});
+
+// Open packed entries in a new tab from their shard
+document.addEventListener('click', function(e) {
+    const link = e.target.closest('.exp-link');
+    const item = link && link.closest('.exp-item');
+    if (!item || !item.dataset.shard) return;
+    e.preventDefault();
+    const win = window.open('', '_blank');
+    plotURL(item).then(url => { win.location = url; });
+});
+
+// Persistent state in IndexedDB: the expanded groups, the scroll position and the feed
+// (name -> added time) seen on the last visit, keyed by page path
+const STATE_DB = 'gdance-index';
+const stateKey = name => location.pathname + ':' + name;
+let stateDB = null;
+
+function openStateDB() {
+    return new Promise((resolve, reject) => {
+        if (!window.indexedDB) return reject(new Error('IndexedDB is not available'));
+        const request = indexedDB.open(STATE_DB, 1);
+        request.onupgradeneeded = () => request.result.createObjectStore('state');
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function stateRequest(mode, action) {
+    return new Promise((resolve, reject) => {
+        const request = action(stateDB.transaction('state', mode).objectStore('state'));
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+const getState = name => stateRequest('readonly', store => store.get(stateKey(name)));
+const putState = (name, value) => stateRequest('readwrite', store => store.put(value, stateKey(name)));
+
+function setExpanded(content, expanded) {
+    content.classList.toggle('active', expanded);
+    content.previousElementSibling.querySelector('.toggle-icon').style.transform =
+        expanded ? 'rotate(90deg)' : 'rotate(0deg)';
+}
+
+function saveView() {
+    if (!stateDB) return;
+    const expanded = Array.from(document.querySelectorAll('.person-content.active'))
+        .map(content => content.parentElement.dataset.group);
+    putState('view', {expanded: expanded, scrollY: window.scrollY});
+}
+
+// Rows added or re-timed since the last visit are marked; the feed is only re-read when the version changes
+function markNewRows(feed, version) {
+    const rows = {};
+    document.querySelectorAll('.exp-item').forEach(item => {
+        rows[item.querySelector('.exp-name').textContent] = item.querySelector('.exp-time').textContent;
+    });
+    if (feed) {
+        let count = 0;
+        document.querySelectorAll('.exp-item').forEach(item => {
+            const name = item.querySelector('.exp-name').textContent;
+            if (feed.rows[name] !== rows[name]) {
+                item.classList.add('new-since-visit');
+                count++;
+            }
+        });
+        if (count) {
+            const note = document.createElement('span');
+            note.textContent = ` · ✨ ${count} new since your last visit`;
+            document.querySelector('.stats').appendChild(note);
+        }
+    }
+    putState('feed', {version: version, rows: rows});
+}
+
+function restoreState() {
+    const script = document.querySelector('script[data-index-version]');
+    const version = script ? script.dataset.indexVersion : '';
+    if ('scrollRestoration' in history) history.scrollRestoration = 'manual';
+    return openStateDB().then(db => {
+        stateDB = db;
+        return Promise.all([getState('view'), getState('feed')]);
+    }).then(([view, feed]) => {
+        if (!feed || feed.version !== version) markNewRows(feed, version);
+        if (view) {
+            document.querySelectorAll('.person-content').forEach(content => {
+                setExpanded(content, view.expanded.includes(content.parentElement.dataset.group));
+            });
+            window.scrollTo(0, view.scrollY);
+        } else {
+            window.scrollTo(0, 0);
+        }
+    }).catch(() => window.scrollTo(0, 0));
+}
+
+// Idle-time prefetch of the rows in view, once scrolling has settled
+const IDLE_PREFETCH_LIMIT = 24;
+const onScreen = new Set();
+let idleTimer = null;
+
+function scheduleIdlePrefetch() {
+    clearTimeout(idleTimer);
+    idleTimer = setTimeout(() => {
+        const idle = window.requestIdleCallback || (callback => setTimeout(() => callback({timeRemaining: () => 10}), 1));
+        idle(deadline => {
+            if (document.hidden || (navigator.connection && navigator.connection.saveData)) return;
+            for (const item of onScreen) {
+                if (prefetched.size >= IDLE_PREFETCH_LIMIT || deadline.timeRemaining() <= 0) break;
+                if (item.offsetParent !== null) prefetch(item);
+            }
+        });
+    }, 1000);
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    restoreState();
+    document.addEventListener('click', e => { if (e.target.closest('.person-header')) saveView(); });
+    document.addEventListener('keydown', e => { if (e.target.tagName !== 'INPUT') saveView(); });
+    let scrollTimer = null;
+    window.addEventListener('scroll', () => {
+        clearTimeout(scrollTimer);
+        scrollTimer = setTimeout(saveView, 300);
+    }, {passive: true});
+    window.addEventListener('pagehide', saveView);
+
+    if ('IntersectionObserver' in window) {
+        const rowObserver = new IntersectionObserver(entries => {
+            entries.forEach(entry => entry.isIntersecting ? onScreen.add(entry.target) : onScreen.delete(entry.target));
+            scheduleIdlePrefetch();
+        });
+        document.querySelectorAll('.exp-item').forEach(item => rowObserver.observe(item));
+    }
+});
+"""
+
+# 页面骨架模板（只包含少量动态字段）
+PAGE_HEAD_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Group Dance 3D Plot - Experiment Records (Organized by Group Size)</title>
+    <meta charset="UTF-8">
+    <link rel="stylesheet" href="{css_href}">
+</head>
+<body>
+    <div class="container">
+        <h1>Group Dance 3D Plot</h1>
+        <p class="subtitle">Experiment Records - Organized by Group Size</p>
+
+        <div class="stats">
+            <strong>{total_experiments}</strong> experiments across <strong>{total_groups}</strong> group sizes{extra_links}
+        </div>
+
+        <input id="exp-filter" class="exp-filter" type="search" placeholder="🔍 Filter by name, model, checkpoint, metrics...">
+
+        <div id="preview-pane" class="preview-pane">
+            <div class="preview-bar">
+                <span class="preview-title"></span>
+                <span>↑/↓ to step &nbsp; <button onclick="closePreview()" title="Close (Esc)">✕</button></span>
+            </div>
+            <iframe class="preview-frame" loading="lazy" title="3D plot preview"></iframe>
+        </div>
+"""
+
+GROUP_OPEN_TEMPLATE = """
+        <div class="person-toggle" data-group="{group}">
+            <div class="{header_class}" onclick="togglePerson(this)">
+                <span><span class="person-icon">{icon}</span>{header_text}</span>
+                <span class="toggle-icon" style="transform: {icon_rotation};">▶</span>
+            </div>
+            <div class="{content_class}">
+"""
+
+# 存在归档/对比视图时，在统计栏中链接到对应页面
+EXTRA_LINK_TEMPLATE = """
+            &nbsp;·&nbsp; <a href="{href}">{text}</a>"""
+
+# 元数据（模型、checkpoint、指标等）的展示行，没有元数据时为空
+META_LINE_TEMPLATE = """\
+                    <div class="exp-meta">{text}</div>
+"""
+
+def render_meta(meta):
+    """返回 (用于过滤的 data-meta 属性值, 展示元数据的HTML)"""
+    parts = [str(meta[key]) for key in ('model', 'checkpoint') if meta.get(key)]
+    if meta.get('frame_count'):
+        parts.append(f"{meta['frame_count']} frames")
+    metrics = format_metrics(meta.get('metrics'))
+    if metrics:
+        parts.append(metrics)
+    if meta.get('source_clip'):
+        parts.append(f"src: {meta['source_clip']}")
+    if not parts:
+        return '', ''
+    text = ' · '.join(parts)
+    return html.escape(text, quote=True), META_LINE_TEMPLATE.format(text=html.escape(text))
+
+# 每个实验条目的行模板，预先绑定 format_map，避免每个条目重新构造 f-string
+EXP_ITEM_TEMPLATE = """\
+                <div class="exp-item" data-file="{view_file}" data-meta="{meta_attr}"{pack_attrs}>
+                    <div class="exp-name">{name}</div>
+{meta_html}                    <div class="exp-details">
+                        <span class="exp-time">Added: {original_date_str}</span>
+                        <span>
+                            <button class="exp-preview" onclick="showPreview(this.closest('.exp-item'))">👁️ Preview</button>
+                            <a href="{file}" target="_blank" class="exp-link">
+                                🎮 Interact with 3D plot
+                            </a>
+                        </span>
+                    </div>
+                </div>
+"""
+render_exp_item = EXP_ITEM_TEMPLATE.format_map
+
+GROUP_CLOSE = """\
+            </div>
+        </div>
+"""
+
+# data-index-version: 分组和条目内容的哈希，页面脚本据此判断自上次访问以来是否有变化
+PAGE_TAIL_TEMPLATE = """
+    </div>
+
+    <script src="{js_src}" data-index-version="{version}"></script>
+</body>
+</html>
+"""
+
+INDEX_VERSION_LENGTH = 12
+
+# 带哈希的静态资源文件名，例如 index.3f2a9c1d0b.css
+ASSET_NAME_PATTERN = re.compile(r'^index\.[0-9a-f]{10}\.(css|js)$')
+
+def write_static_assets(output_dir="."):
+    """将CSS/JS写入带内容哈希的静态文件（内容不变时不重写），并清理过期的旧版本"""
+    asset_names = {}
+    for ext, content in (('css', INDEX_CSS), ('js', INDEX_JS)):
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]
+        asset_name = f"index.{digest}.{ext}"
+        asset_path = os.path.join(output_dir, asset_name)
+        
+        if not os.path.exists(asset_path):
+            with open(asset_path, "w", encoding='utf-8') as f:
+                f.write(content)
+            print(f"  🧩 生成静态资源: {asset_name}")
+        
+        # 删除旧哈希版本，避免仓库中堆积
+        for old_path in glob.glob(os.path.join(output_dir, f"index.*.{ext}")):
+            old_name = os.path.basename(old_path)
+            if old_name != asset_name and ASSET_NAME_PATTERN.match(old_name):
+                os.remove(old_path)
+                print(f"  🗑️  删除过期静态资源: {old_name}")
+        
+        asset_names[ext] = asset_name
+    return asset_names
+
+def render_page_head(output_file, total_experiments, total_groups):
+    """写入静态资源并生成页面头部，返回 (头部HTML, 静态资源文件名)"""
+    output_dir = os.path.dirname(output_file)
+    asset_names = write_static_assets(output_dir or ".")
+    
+    # 归档的实验只通过归档索引访问，主页面只渲染活跃的实验
+    extra_links = ""
+    archive_index_file = os.path.join(output_dir, "archive", "index.json")
+    if os.path.exists(archive_index_file):
+        with open(archive_index_file, 'r', encoding='utf-8') as f:
+            archived_count = len(json.load(f))
+        extra_links += EXTRA_LINK_TEMPLATE.format(href="archive/index.html", text=f"🗄️ {archived_count} archived")
+    compare_file = os.path.join(output_dir, "compare.json")
+    if os.path.exists(compare_file):
+        with open(compare_file, 'r', encoding='utf-8') as f:
+            compared_count = len(json.load(f)['clips'])
+        extra_links += EXTRA_LINK_TEMPLATE.format(href="compare.html", text=f"⚖️ {compared_count} clips compared across runs")
+    
+    head_html = PAGE_HEAD_TEMPLATE.format(
+        css_href=asset_names['css'],
+        total_experiments=total_experiments,
+        total_groups=total_groups,
+        extra_links=extra_links
+    )
+    return head_html, asset_names
+
+def render_group_open(person_count, experiment_count, is_first=False):
+    """人数分组折叠区域的开头；person_count 为 'unknown' 表示无法确定人数"""
+    if person_count == 'unknown':
+        header_text = f"❓ Unknown Group Size ({experiment_count} experiments)"
+        header_class = "person-header unknown"
+        icon = "❓"
+    else:
+        header_text = f"👥 {person_count} People ({experiment_count} experiments)"
+        header_class = "person-header"
+        icon = "👥"
+    
+    return GROUP_OPEN_TEMPLATE.format(
+        group=person_count,
+        header_class=header_class,
+        icon=icon,
+        header_text=header_text,
+        icon_rotation="rotate(90deg)" if is_first else "rotate(0deg)",
+        content_class="person-content active" if is_first else "person-content",
+    )
+
+# 文件名中人数信息的命名模式（按优先级排列）
+PERSON_COUNT_PATTERNS = [
+    r'gdance_sample_[^_]+_p(\d+)_',  # gdance_sample_{split}_p{num_person}_{name}
+    r'_person(\d+)',                  # {prefix}_person{num_person}
+    r'_p(\d+)_',                     # {prefix}_p{num_person}_{suffix}
+    r'person(\d+)',                  # {prefix}person{num_person}
+]
 
 def extract_person_count(filename):
     """从文件名中提取人数信息"""
-    # 支持多种命名模式
-    patterns = [
-        r'gdance_sample_[^_]+_p(\d+)_',  # gdance_sample_{split}_p{num_person}_{name}
-        r'_person(\d+)',                  # {prefix}_person{num_person}
-        r'_p(\d+)_',                     # {prefix}_p{num_person}_{suffix}
-        r'person(\d+)',                  # {prefix}person{num_person}
-    ]
-    
-    for pattern in patterns:
+    for pattern in PERSON_COUNT_PATTERNS:
         match = re.search(pattern, filename)
         if match:
             return int(match.group(1))
@@ -22,8 +736,121 @@ def extract_person_count(filename):
     # 如果没有匹配到，返回 None 表示未知人数
     return None
 
+# gdance_sample_{split}_p{num_person}_{video_id}_{segment}_{start}_{end}_{suffix}
+# 视频ID本身可能包含下划线，所以从右往左匹配固定的数字字段
+CLIP_NAME_PATTERN = re.compile(
+    r'^gdance_sample_(?P<split>[^_]+)_p(?P<person_count>\d+)_(?P<video_id>.+)'
+    r'_(?P<segment>\d+)_(?P<start_frame>\d+)_(?P<end_frame>\d+)_(?P<suffix>[^_]+)$'
+)
+
+def experiment_person_count(exp):
+    """实验的人数：元数据文件中的 num_dancers 优先于文件名"""
+    num_dancers = (exp.get('meta') or {}).get('num_dancers')
+    return num_dancers if isinstance(num_dancers, int) else extract_person_count(exp['name'])
+
+def parse_clip_name(filename):
+    """解析标准命名的片段文件名，返回各字段组成的字典；不符合命名规则时返回 None"""
+    match = CLIP_NAME_PATTERN.match(filename)
+    if not match:
+        return None
+    record = match.groupdict()
+    for key in ('person_count', 'start_frame', 'end_frame'):
+        record[key] = int(record[key])
+    return record
+
+# 索引中使用的标准时间格式，例如 "Fri Mar 21 12:59:18 2025"
+STANDARD_TIME_PATTERN = re.compile(r'[A-Z][a-z]{2}\s+[A-Z][a-z]{2}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\d{4}')
+# exp-time / Time added 中时间前面的标签
+TIME_LABEL_PATTERN = re.compile(r'^\s*(?:🔄\s*)?(?:Updated|Added|Time added)\s*:\s*', re.IGNORECASE)
+
+class IndexTimeParser(HTMLParser):
+    """单次遍历索引页面，提取 (文件名, 时间字符串)
+
+    支持的格式:
+        新版本 (按人数/按日期分组): <div class="exp-name">name</div> ... <span class="exp-time">Added: / 🔄 Updated: date</span>
+        旧版本: <h3>name</h3> ... <p><strong>Time added:</strong> date</p>
+        兜底: 文件名之后出现的第一个标准格式时间
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.pairs = []  # [(name, time_str, 格式)]
+        self.name_samples = []
+        self.time_samples = []
+        self._capture = None  # 正在收集文本的元素: 'name' / 'time' / 'old_time'
+        self._text = []
+        self._pending_name = None  # 还没有找到时间的文件名
+
+    def _start_capture(self, kind):
+        self._capture = kind
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        classes = (dict(attrs).get('class') or '').split()
+        if tag == 'div' and 'exp-name' in classes or tag == 'h3':
+            self._start_capture('name')
+        elif tag == 'span' and any(c.startswith('exp-time') for c in classes):
+            self._start_capture('time')
+        elif tag == 'p' and self._pending_name is not None:
+            self._start_capture('old_time')
+
+    def handle_endtag(self, tag):
+        if self._capture is None:
+            return
+        text = ''.join(self._text).strip()
+        if self._capture == 'name' and tag in ('div', 'h3'):
+            self._capture = None
+            self._pending_name = text
+            if len(self.name_samples) < 5:
+                self.name_samples.append(text)
+        elif self._capture == 'time' and tag == 'span':
+            self._capture = None
+            if len(self.time_samples) < 5:
+                self.time_samples.append(text)
+            label = TIME_LABEL_PATTERN.match(text)
+            if label:
+                self._emit(text[label.end():], 'updated' if 'updated' in label.group(0).lower() else 'added')
+            else:
+                match = STANDARD_TIME_PATTERN.search(text)
+                if match:
+                    self._emit(match.group(0), 'loose')
+        elif self._capture == 'old_time' and tag == 'p':
+            self._capture = None
+            if text.lower().startswith('time added:'):
+                self._emit(text[len('time added:'):], 'old')
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._text.append(data)
+        elif self._pending_name is not None:
+            match = STANDARD_TIME_PATTERN.search(data)
+            if match:
+                self._emit(match.group(0), 'generic')
+
+    def _emit(self, time_str, kind):
+        if self._pending_name is not None:
+            self.pairs.append((self._pending_name, time_str.strip(), kind))
+            self._pending_name = None
+
+def parse_time_string(time_str):
+    """解析索引中的时间字符串，失败时返回 None"""
+    try:
+        # 解析时间字符串，例如: "Fri Mar 21 12:59:18 2025"
+        time_obj = time.strptime(time_str, "%a %b %d %H:%M:%S %Y")
+        return datetime(*time_obj[:6])
+    except ValueError:
+        pass
+    try:
+        # 尝试解析 ISO 格式或其他格式
+        return datetime.fromisoformat(time_str.replace('T', ' ').replace('Z', ''))
+    except ValueError:
+        return None
+
 def parse_existing_index(index_file="index.html"):
-    """解析现有的index.html文件，提取文件名和对应的Time added信息"""
+    """解析现有的index.html文件，提取文件名和对应的Time added信息
+
+    使用 HTMLParser 流式读取，只遍历文件一次，耗时与文件大小成线性关系
+    """
     existing_times = {}
     
     if not os.path.exists(index_file):
@@ -33,90 +860,58 @@ def parse_existing_index(index_file="index.html"):
     print(f"📖 解析现有的 {index_file} 文件...")
     
     try:
+        parser = IndexTimeParser()
         with open(index_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 多种解析模式，确保能够正确提取时间信息
-        
-        # 模式1: 匹配新版本的格式 (折叠式布局) - 包含 Added: 和 Updated:
-        # <div class="exp-name">filename</div> ... <span class="exp-time">Added: date</span>
-        # <div class="exp-name">filename</div> ... <span class="exp-time">🔄 Updated: date</span>
-        pattern1 = r'<div class="exp-name">([^<]+)</div>.*?<span class="exp-time[^"]*">(?:🔄 Updated:|Added:)\s*([^<]+)</span>'
-        matches1 = re.findall(pattern1, content, re.DOTALL | re.IGNORECASE)
+            for chunk in iter(lambda: f.read(1 << 16), ''):
+                parser.feed(chunk)
+        parser.close()
         
-        # 模式2: 更宽松的匹配，处理可能的emoji和特殊字符
-        # 匹配任何形式的时间前缀
-        pattern2 = r'<div class="exp-name">([^<]+)</div>.*?<span[^>]*class="exp-time[^"]*"[^>]*>(?:[^:]*:)?\s*([A-Z][a-z]{2}\s+[A-Z][a-z]{2}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\d{4})</span>'
-        matches2 = re.findall(pattern2, content, re.DOTALL | re.IGNORECASE)
-        
-        # 模式3: 匹配旧版本的格式
-        # <h3>filename</h3> ... <p><strong>Time added:</strong> date</p>
-        pattern3 = r'<h3>([^<]+)</h3>.*?<p><strong>Time added:</strong>\s*([^<]+)</p>'
-        matches3 = re.findall(pattern3, content, re.DOTALL | re.IGNORECASE)
-        
-        # 模式4: 更通用的时间匹配，直接查找标准时间格式
-        # 在exp-name附近查找标准时间格式
-        pattern4 = r'<div class="exp-name">([^<]+)</div>.*?([A-Z][a-z]{2}\s+[A-Z][a-z]{2}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\d{4})'
-        matches4 = re.findall(pattern4, content, re.DOTALL | re.IGNORECASE)
-        
-        all_matches = matches1 + matches2 + matches3 + matches4
-        
-        print(f"  🔍 找到 {len(matches1)} 个新格式匹配 (Added/Updated)")
-        print(f"  🔍 找到 {len(matches2)} 个宽松格式匹配")
-        print(f"  🔍 找到 {len(matches3)} 个旧格式匹配") 
-        print(f"  🔍 找到 {len(matches4)} 个通用时间匹配")
+        counts = defaultdict(int)
+        for _, _, kind in parser.pairs:
+            counts[kind] += 1
+        print(f"  🔍 找到 {counts['added'] + counts['updated']} 个新格式匹配 (Added: {counts['added']}, Updated: {counts['updated']})")
+        print(f"  🔍 找到 {counts['loose']} 个宽松格式匹配")
+        print(f"  🔍 找到 {counts['old']} 个旧格式匹配")
+        print(f"  🔍 找到 {counts['generic']} 个通用时间匹配")
         
         processed_count = 0
-        for filename, time_str in all_matches:
-            # 清理文件名和时间字符串
-            filename = filename.strip()
-            time_str = time_str.strip()
-            
+        for filename, time_str, _ in parser.pairs:
             # 跳过已经处理过的文件（避免重复）
             if filename in existing_times:
                 continue
-                
-            try:
-                # 解析时间字符串，例如: "Fri Mar 21 12:59:18 2025"
-                time_obj = time.strptime(time_str, "%a %b %d %H:%M:%S %Y")
-                datetime_obj = datetime(*time_obj[:6])
-                existing_times[filename] = datetime_obj
-                processed_count += 1
-                print(f"  ✅ {filename}: {time_str}")
-            except ValueError as e:
-                print(f"  ⚠️  无法解析时间 '{time_str}' for {filename}: {e}")
-                # 尝试其他时间格式
-                try:
-                    # 尝试解析 ISO 格式或其他格式
-                    datetime_obj = datetime.fromisoformat(time_str.replace('T', ' ').replace('Z', ''))
-                    existing_times[filename] = datetime_obj
-                    processed_count += 1
-                    print(f"  ✅ {filename}: {time_str} (备用格式)")
-                except:
-                    print(f"  ❌ 完全无法解析时间 '{time_str}' for {filename}")
+            
+            datetime_obj = parse_time_string(time_str)
+            if datetime_obj is None:
+                print(f"  ❌ 完全无法解析时间 '{time_str}' for {filename}")
+                continue
+            existing_times[filename] = datetime_obj
+            processed_count += 1
+            print(f"  ✅ {filename}: {time_str}")
         
         print(f"📊 成功解析 {processed_count} 个文件的时间信息")
         
         # 如果解析结果很少，提供调试信息
         if processed_count < 10:
             print(f"⚠️  解析结果较少，请检查HTML格式")
-            # 查找所有exp-name和exp-time的样例
-            exp_name_samples = re.findall(r'<div class="exp-name">([^<]+)</div>', content)[:5]
-            exp_time_samples = re.findall(r'<span[^>]*class="exp-time[^"]*"[^>]*>([^<]+)</span>', content)[:5]
-            
-            print(f"实验名称样例: {exp_name_samples}")
-            print(f"时间信息样例: {exp_time_samples}")
+            print(f"实验名称样例: {parser.name_samples}")
+            print(f"时间信息样例: {parser.time_samples}")
         
     except Exception as e:
         print(f"❌ 解析现有索引文件时出错: {e}")
     
     return existing_times
 
-def create_visualization_index(experiment_list, output_file="index.html"):
-    """创建包含多个可视化链接的索引页面，按人数分组并支持折叠"""
+def create_visualization_index(experiment_list, output_file="index.html", added_times=None):
+    """创建包含多个可视化链接的索引页面，按人数分组并支持折叠
+
+    added_times: 其它来源记录的添加时间 {实验名: datetime}（例如合并多个节点的清单），与现有索引中的时间取最早的
+    """
     
     # 首先解析现有的index.html文件获取准确的时间信息
     existing_times = parse_existing_index(output_file)
+    for name, added in (added_times or {}).items():
+        if name not in existing_times or added < existing_times[name]:
+            existing_times[name] = added
     
     # 获取今天的日期
     today = datetime.now().date()
@@ -133,8 +928,7 @@ def create_visualization_index(experiment_list, output_file="index.html"):
     for exp in experiment_list:
         filename = exp['name']  # 不带扩展名的文件名
         
-        # 提取人数信息
-        person_count = extract_person_count(filename)
+        person_count = experiment_person_count(exp)
         if person_count is None:
             print(f"  ⚠️  无法从文件名提取人数: {filename}")
             unknown_person_experiments.append(exp)
@@ -144,7 +938,8 @@ def create_visualization_index(experiment_list, output_file="index.html"):
         
         # 获取文件的系统时间信息
         try:
-            mtime = os.path.getmtime(exp['file'])  # 文件修改时间
+            # 文件修改时间（扫描目录时已记录；打包存储的实验使用打包时记录的修改时间）
+            mtime = exp['mtime'] if 'mtime' in exp else os.path.getmtime(exp['file'])
             system_datetime = datetime.fromtimestamp(mtime)
             system_date = system_datetime.date()
             
@@ -211,6 +1006,13 @@ def create_visualization_index(experiment_list, output_file="index.html"):
         exp['original_date_str'] = date_obj.strftime('%a %b %d %H:%M:%S %Y')  # 保持原格式
         exp['is_updated_today'] = (filename in existing_times and system_date == today and time_diff_seconds > MIN_UPDATE_THRESHOLD_SECONDS if 'time_diff_seconds' in locals() else False)
         exp['person_count'] = person_count
+        exp.setdefault('view_file', exp['file'])  # 预览用的页面（有优化版本时指向优化版本）
+        # 打包存储的实验由页面脚本按字节范围从分片中读取
+        exp['pack_attrs'] = (
+            f' data-shard="{exp["pack_shard"]}" data-offset="{exp["pack_offset"]}" data-length="{exp["pack_length"]}"'
+            if 'pack_shard' in exp else ''
+        )
+        exp['meta_attr'], exp['meta_html'] = render_meta(exp.get('meta') or {})
         
         experiments_by_person[person_count].append(exp)
     
@@ -245,260 +1047,27 @@ def create_visualization_index(experiment_list, output_file="index.html"):
     
     print(f"📈 总计: {len(experiment_list)} 个实验分布在 {len(sorted_person_counts)} 个人数组")
     
-    # 创建HTML内容
-    html_template = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Group Dance 3D Plot - Experiment Records (Organized by Group Size)</title>
-        <meta charset="UTF-8">
-        <style>
-            body {{ 
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; 
-                margin: 20px; 
-                background-color: #f5f5f5;
-                line-height: 1.6;
-            }}
-            .container {{
-                max-width: 1200px;
-                margin: 0 auto;
-                background: white;
-                padding: 30px;
-                border-radius: 10px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }}
-            h1 {{ 
-                color: #2c3e50; 
-                text-align: center;
-                margin-bottom: 10px;
-                font-size: 2.5em;
-            }}
-            .subtitle {{
-                text-align: center;
-                color: #7f8c8d;
-                font-size: 1.2em;
-                margin-bottom: 30px;
-            }}
-            .person-toggle {{
-                margin: 15px 0;
-                border: 1px solid #e0e0e0;
-                border-radius: 8px;
-                overflow: hidden;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-            }}
-            .person-header {{
-                background: linear-gradient(135deg, #74b9ff 0%, #0984e3 100%);
-                color: white;
-                padding: 15px 20px;
-                cursor: pointer;
-                font-weight: 600;
-                font-size: 1.1em;
-                transition: all 0.3s ease;
-                user-select: none;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-            }}
-            .person-header:hover {{
-                background: linear-gradient(135deg, #0984e3 0%, #74b9ff 100%);
-            }}
-            .person-header.unknown {{
-                background: linear-gradient(135deg, #a29bfe 0%, #6c5ce7 100%);
-            }}
-            .person-header.unknown:hover {{
-                background: linear-gradient(135deg, #6c5ce7 0%, #a29bfe 100%);
-            }}
-            .toggle-icon {{
-                transition: transform 0.3s ease;
-                font-size: 1.2em;
-            }}
-            .person-content {{
-                display: none;
-                background: #fafafa;
-                border-top: 1px solid #e0e0e0;
-            }}
-            .person-content.active {{
-                display: block;
-            }}
-            .exp-item {{ 
-                margin: 0;
-                padding: 15px 20px; 
-                border-bottom: 1px solid #eeeeee;
-                background: white;
-                transition: background-color 0.2s ease;
-            }}
-            .exp-item:last-child {{
-                border-bottom: none;
-            }}
-            .exp-item:hover {{
-                background-color: #f8f9ff;
-            }}
-            .exp-name {{ 
-                font-weight: 600;
-                color: #2c3e50;
-                margin-bottom: 8px;
-                font-size: 1.05em;
-            }}
-            .exp-details {{
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                flex-wrap: wrap;
-                gap: 10px;
-            }}
-            .exp-time {{
-                color: #7f8c8d;
-                font-size: 0.9em;
-            }}
-            .exp-link {{
-                display: inline-block;
-                padding: 8px 16px;
-                background: linear-gradient(135deg, #00b894 0%, #00a085 100%);
-                color: white;
-                text-decoration: none;
-                border-radius: 5px;
-                font-size: 0.9em;
-                transition: all 0.3s ease;
-                font-weight: 500;
-            }}
-            .exp-link:hover {{
-                background: linear-gradient(135deg, #00a085 0%, #00b894 100%);
-                transform: translateY(-1px);
-                box-shadow: 0 4px 8px rgba(0, 184, 148, 0.3);
-            }}
-            .stats {{
-                background: #ecf0f1;
-                padding: 15px;
-                border-radius: 8px;
-                margin-bottom: 20px;
-                text-align: center;
-                color: #2c3e50;
-            }}
-            .stats strong {{
-                color: #e74c3c;
-                font-size: 1.2em;
-            }}
-            .person-icon {{
-                margin-right: 8px;
-                font-size: 1.1em;
-            }}
-            @media (max-width: 768px) {{
-                .container {{ margin: 10px; padding: 15px; }}
-                h1 {{ font-size: 2em; }}
-                .exp-details {{ flex-direction: column; align-items: flex-start; }}
-                .person-header {{ padding: 12px 15px; }}
-                .exp-item {{ padding: 12px 15px; }}
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>Group Dance 3D Plot</h1>
-            <p class="subtitle">Experiment Records - Organized by Group Size</p>
-            
-            <div class="stats">
-                <strong>{total_experiments}</strong> experiments across <strong>{total_groups}</strong> group sizes
-            </div>
-    """
-    
-    html_content = html_template.format(
-        total_experiments=len(experiment_list),
-        total_groups=len(sorted_person_counts)
-    )
+    # 创建HTML内容：静态部分写入外部资源，页面只包含动态内容
+    head_html, asset_names = render_page_head(output_file, len(experiment_list), len(sorted_person_counts))
+    html_parts = [head_html]
+    version = hashlib.sha256()
     
     # 为每个人数分组创建一个折叠区域
     for i, person_count in enumerate(sorted_person_counts):
         experiments = experiments_by_person[person_count]
         
-        # 设置标题和样式
-        if person_count == 'unknown':
-            header_text = f"❓ Unknown Group Size ({len(experiments)} experiments)"
-            header_class = "person-header unknown"
-            icon = "❓"
-        else:
-            header_text = f"👥 {person_count} People ({len(experiments)} experiments)"
-            header_class = "person-header"
-            icon = "👥"
-        
-        # 第一个分组默认展开
-        is_first = i == 0
-        content_class = "person-content active" if is_first else "person-content"
-        icon_rotation = "rotate(90deg)" if is_first else "rotate(0deg)"
-        
-        html_content += f"""
-            <div class="person-toggle">
-                <div class="{header_class}" onclick="togglePerson(this)">
-                    <span><span class="person-icon">{icon}</span>{header_text}</span>
-                    <span class="toggle-icon" style="transform: {icon_rotation};">▶</span>
-                </div>
-                <div class="{content_class}">
-        """
+        # 第一个分组默认展开（页面脚本会恢复读者上次展开的分组）
+        group_parts = [render_group_open(person_count, len(experiments), is_first=i == 0)]
         
         # 添加该人数分组下的所有实验
-        for exp in experiments:
-            html_content += f"""
-                    <div class="exp-item">
-                        <div class="exp-name">{exp['name']}</div>
-                        <div class="exp-details">
-                            <span class="exp-time">Added: {exp['original_date_str']}</span>
-                            <a href="{exp['file']}" target="_blank" class="exp-link">
-                                🎮 Interact with 3D plot
-                            </a>
-                        </div>
-                    </div>
-            """
-        
-        html_content += """
-                </div>
-            </div>
-        """
+        group_parts.extend(render_exp_item(exp) for exp in experiments)
+        group_parts.append(GROUP_CLOSE)
+        for part in group_parts:
+            version.update(part.encode('utf-8'))
+        html_parts.extend(group_parts)
     
-    html_content += """
-        </div>
-
-        <script>
-            function togglePerson(header) {
-                const content = header.nextElementSibling;
-                const icon = header.querySelector('.toggle-icon');
-                
-                if (content.classList.contains('active')) {
-                    content.classList.remove('active');
-                    icon.style.transform = 'rotate(0deg)';
-                } else {
-                    content.classList.add('active');
-                    icon.style.transform = 'rotate(90deg)';
-                }
-            }
-
-            // Add keyboard support
-            document.addEventListener('keydown', function(e) {
-                if (e.key === 'Escape') {
-                    // Close all toggles
-                    document.querySelectorAll('.person-content.active').forEach(content => {
-                        content.classList.remove('active');
-                        const icon = content.previousElementSibling.querySelector('.toggle-icon');
-                        icon.style.transform = 'rotate(0deg)';
-                    });
-                }
-                
-                // Press 'a' to expand all sections
-                if (e.key === 'a' || e.key === 'A') {
-                    document.querySelectorAll('.person-content').forEach(content => {
-                        content.classList.add('active');
-                        const icon = content.previousElementSibling.querySelector('.toggle-icon');
-                        icon.style.transform = 'rotate(90deg)';
-                    });
-                }
-            });
-
-            // Auto-scroll to top on page load
-            window.addEventListener('load', function() {
-                window.scrollTo(0, 0);
-            });
-        </script>
-    </body>
-    </html>
-    """
+    html_parts.append(PAGE_TAIL_TEMPLATE.format(js_src=asset_names['js'], version=version.hexdigest()[:INDEX_VERSION_LENGTH]))
+    html_content = "".join(html_parts)
     
     with open(output_file, "w", encoding='utf-8') as f:
         f.write(html_content)
@@ -528,36 +1097,108 @@ def push_to_github(repo_dir, message="更新可视化索引页面"):
         print(f"❌ 推送到GitHub时出错: {e}")
         return False
 
-def main():
-    root = 'results'
+def collect_experiments(root='results'):
+    """扫描结果目录，返回实验列表；目录不存在时返回 None"""
     experiments = []
 
     if not os.path.exists(root):
         print(f"❌ 目录 '{root}' 不存在")
-        return
+        return None
 
     print(f"🔍 扫描目录: {root}")
     
-    for file in os.listdir(root):
-        if file.endswith('.html'):
-            meta = {}
-            meta['name'] = file.split('.')[0]  # 文件名（不含扩展名）
-            meta['file'] = os.path.join(root, file)
-            
-            if os.path.exists(meta['file']):
-                experiments.append(meta)
-                print(f"  📄 发现: {file}")
+    # 去重记录中的重复文件不在索引中重复列出
+    duplicates = load_duplicates(root)
+    
+    # 扫描时记录大小和修改时间，后续生成索引和统计时不再逐个 stat
+    with os.scandir(root) as it:
+        entries = [(entry.name, entry.stat()) for entry in it if is_result_page(entry.name)]
+    for file, st in entries:
+        meta = {}
+        meta['name'] = file.split('.')[0]  # 文件名（不含扩展名）
+        if meta['name'] in duplicates:
+            print(f"  ♻️  跳过重复: {file} (与 {duplicates[meta['name']]} 相同)")
+            continue
+        meta['file'] = os.path.join(root, file)
+        meta['mtime'] = st.st_mtime
+        meta['size'] = st.st_size
+        
+        # 如果存在不旧于原始文件的优化版本，内联预览使用优化版本，外链仍指向原始页面
+        optimized_file = os.path.join(OPTIMIZED_DIR, file)
+        if os.path.exists(optimized_file) and os.path.getmtime(optimized_file) >= st.st_mtime:
+            meta['view_file'] = optimized_file
+        experiments.append(meta)
+        print(f"  📄 发现: {file}")
+    
+    # 已打包且原始文件已删除的实验
+    seen = {exp['name'] for exp in experiments}
+    for meta in packed_experiments(exclude=seen | set(duplicates)):
+        experiments.append(meta)
+        print(f"  📦 发现 (打包): {meta['name']}")
+    
+    # 读取生成任务写入的元数据文件
+    attach_sidecars(experiments, root)
+    
+    return experiments
+
+def build_outputs(experiments, output_file="index.html", added_times=None):
+    """生成索引页面和数据集统计"""
+    # 先生成对比视图，索引页面根据 compare.json 是否存在添加链接
+    from compare_runs import write_comparison
+    write_comparison(experiments, os.path.dirname(output_file) or ".")
+    
+    today = datetime.now().strftime('%Y-%m-%d')
+    print(f"\n📝 生成按人数分组的索引页面 (今天: {today})...")
+    create_visualization_index(experiments, output_file, added_times)
+    
+    # 数据集统计依赖 NumPy，缺少时跳过，不影响索引页面的生成
+    try:
+        from dataset_stats import write_dataset_stats
+    except ImportError as e:
+        print(f"⚠️  跳过数据集统计 (缺少依赖: {e})")
+    else:
+        write_dataset_stats(experiments, os.path.dirname(output_file) or ".")
+
+def main():
+    # 配置了 retention.json 时，先把旧的实验归档，索引只处理活跃的实验
+    from retention import apply_retention
+    apply_retention('results')
+    
+    experiments = collect_experiments('results')
+    if experiments is None:
+        return
     
     if not experiments:
         print("❌ 在results目录中没有找到HTML文件")
         return
     
-    today = datetime.now().strftime('%Y-%m-%d')
-    print(f"\n📝 生成按人数分组的索引页面 (今天: {today})...")
-    create_visualization_index(experiments, "index.html")
+    build_outputs(experiments, "index.html")
     
+    today = datetime.now().strftime('%Y-%m-%d')
     print(f"\n🚀 推送到GitHub...")
     push_to_github('./', message=f"更新可视化索引页面 - 改为按人数分组 ({today})")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # python update_html.py serve [--port 8000 ...] 启动本地预览服务器
+    # python update_html.py publish [...] 并行生成索引、推送GitHub和上传Hugging Face
+    # python update_html.py lowmem [...] 低内存模式生成索引（不含元数据/统计/对比视图，不推送）
+    # python update_html.py manifest [...] / merge [...] 多节点构建：生成本节点的部分清单 / 合并清单生成索引
+    # python update_html.py transform [...] 单次流式重写 results/ 中的页面（共享 plotly.js、紧凑 JSON、去缩进）
+    # 不带参数时重新生成索引并推送
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from serve_index import main as serve_main
+        serve_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'publish':
+        from publish import main as publish_main
+        publish_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'lowmem':
+        from lowmem_build import main as lowmem_main
+        lowmem_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] in ('manifest', 'merge'):
+        from node_manifests import main as manifests_main
+        manifests_main(sys.argv[1:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'transform':
+        from transform_results import main as transform_main
+        transform_main(sys.argv[2:])
+    else:
+        main()
\ No newline at end of file
@@ -1,8 +1,31 @@
+import os
+import argparse
+
 from huggingface_hub import upload_folder
 
-upload_folder(
-    folder_path="path/to/your/data",
-    repo_id="YLinca/gdance-visualizations",  # ✅ 带上用户名
-    repo_type="dataset",
-    # token="your_hf_token"  # 如果没有登录 CLI，就加上这一行
-)
\ No newline at end of file
+REPO_ID = "YLinca/gdance-visualizations"  # ✅ 带上用户名
+
+def upload_results(folder_path="results", repo_id=REPO_ID, path_in_repo=None, ignore_patterns=None, token=None):
+    """把结果目录上传到 Hugging Face 数据集仓库"""
+    return upload_folder(
+        folder_path=folder_path,
+        repo_id=repo_id,
+        repo_type="dataset",
+        path_in_repo=path_in_repo,
+        ignore_patterns=ignore_patterns,
+        token=token,  # 如果没有登录 CLI，就传入 token
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="上传可视化结果到 Hugging Face")
+    parser.add_argument('--folder', default="results", help="要上传的目录")
+    parser.add_argument('--repo-id', default=REPO_ID)
+    parser.add_argument('--path-in-repo', default=None, help="上传到仓库中的子目录")
+    parser.add_argument('--ignore', action='append', default=None, help="不上传的文件模式，可重复指定")
+    args = parser.parse_args(argv)
+
+    upload_results(args.folder, args.repo_id, args.path_in_repo, args.ignore, token=os.environ.get("HF_TOKEN"))
+    print(f"✅ 已上传 {args.folder} 到 {args.repo_id}")
+
+if __name__ == "__main__":
+    main()